@@ -0,0 +1,112 @@
+from dataclasses import dataclass
+
+# Files are only aligned with chapters when their total lengths differ by less than this fraction,
+# otherwise they're likely from another edition of the book
+MAX_RUNTIME_DIFFERENCE = 0.05
+
+
+@dataclass(frozen=True, slots=True)
+class Segment:
+    """
+    The chapters in a file: chapters `first_chapter` to `last_chapter`, or part `part` of `parts`
+    of a chapter which is split between several files.
+    """
+
+    first_chapter: int
+    last_chapter: int
+    part: int = 1
+    parts: int = 1
+
+    def get_title(self, chapter_titles) -> str:
+        title = chapter_titles[self.first_chapter]
+        if self.parts > 1:
+            return f"{title} (Part {self.part})"
+        if self.last_chapter > self.first_chapter:
+            return f"{title} - {chapter_titles[self.last_chapter]}"
+        return title
+
+
+def align_chapters(file_lengths, chapter_lengths) -> list[Segment] | None:
+    """
+    Aligns the files of a book with its chapters, both given as lengths in seconds in the order they're played,
+    and returns the `Segment` of each file.
+
+    When there are fewer files than chapters, each file gets the chapters which best fit in it. When there are
+    more, each chapter is split between the files which best fit in it. Either way, the order of the files and
+    chapters is kept. Returns None if the total lengths of the files and chapters are too different to align them.
+    """
+    if not file_lengths or not chapter_lengths:
+        return None
+    files_runtime = sum(file_lengths)
+    chapters_runtime = sum(chapter_lengths)
+    if files_runtime <= 0 or abs(files_runtime - chapters_runtime) > MAX_RUNTIME_DIFFERENCE * chapters_runtime:
+        return None
+
+    # scale the files to the length of the chapters, so that a small difference in the total length
+    # (e.g the files leaving out Audible's intro) isn't added up over the whole book
+    file_ends = get_boundaries(file_lengths, chapters_runtime / files_runtime)
+    chapter_ends = get_boundaries(chapter_lengths)
+    if len(file_lengths) <= len(chapter_lengths):
+        # every file ends where one of the chapters does
+        last_chapters = [*match_boundaries(file_ends, chapter_ends), len(chapter_lengths) - 1]
+        first_chapters = [0] + [c + 1 for c in last_chapters[:-1]]
+        return [Segment(first, last) for first, last in zip(first_chapters, last_chapters, strict=True)]
+
+    # every chapter ends where one of the files does
+    last_files = [*match_boundaries(chapter_ends, file_ends), len(file_lengths) - 1]
+    segments = []
+    first_file = 0
+    for chapter, last_file in enumerate(last_files):
+        parts = last_file - first_file + 1
+        segments.extend(Segment(chapter, chapter, part, parts) for part in range(1, parts + 1))
+        first_file = last_file + 1
+    return segments
+
+
+def get_boundaries(lengths, scale: float = 1.0) -> list[float]:
+    """Returns the times at which each of `lengths` ends, except for the last one which ends with the book."""
+    boundaries = []
+    end = 0.0
+    for length in lengths[:-1]:
+        end += length * scale
+        boundaries.append(end)
+    return boundaries
+
+
+def match_boundaries(short: list[float], long: list[float]) -> list[int]:
+    """
+    Matches each of the ascending times in `short` with a different one of those in `long` in the same order,
+    so that the total distance between matched times is as small as possible. Returns the index in `long`
+    of each match.
+
+    Since the order is kept, `short[i]` can only be matched with `long[i]` to `long[i + slack]`, where `slack`
+    is how many more times `long` has. This takes O(len(short) * (slack + 1)) time, which is linear when
+    both have a similar number of times.
+    """
+    if not short:
+        return []
+    slack = len(long) - len(short)
+    # costs[d] is the lowest total distance so far with the current time matched to long[i + d].
+    # The offset d of consecutive times can only stay the same or grow, otherwise the order wouldn't be kept
+    costs = [abs(short[0] - long[d]) for d in range(slack + 1)]
+    # for each time after the first, the offset of the previous time for each of its own offsets
+    previous_offsets = []
+    for i in range(1, len(short)):
+        best = 0
+        offsets = []
+        new_costs = []
+        for d in range(slack + 1):
+            if costs[d] < costs[best]:
+                best = d
+            offsets.append(best)
+            new_costs.append(costs[best] + abs(short[i] - long[i + d]))
+        previous_offsets.append(offsets)
+        costs = new_costs
+
+    d = min(range(slack + 1), key=costs.__getitem__)
+    matches = [len(short) - 1 + d]
+    for i, offsets in zip(range(len(short) - 2, -1, -1), reversed(previous_offsets), strict=True):
+        d = offsets[d]
+        matches.append(i + d)
+    matches.reverse()
+    return matches
@@ -1,12 +1,23 @@
+import contextvars
 import json
-import xml.etree.ElementTree as ET
+import time
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
 from time import sleep
-from urllib import parse, request
+from typing import TYPE_CHECKING, BinaryIO
+from urllib import parse
 from urllib.error import HTTPError
 
-import tldextract
+from .cache import ResponseCache, TTLCache
+from .client import HTTPClient, Response
+from .metrics import Metrics
+from .ratelimit import RateLimiter, parse_retry_after
+from .tracing import tracer
 
-from .book import Book, BookChapters
+if TYPE_CHECKING:
+    from xml.etree.ElementTree import Element
+
+    from .book import Book, BookChapters
 
 AUDIBLE_ENDPOINTS = {
     "au": "https://api.audible.com.au/1.0/catalog/products",
@@ -21,7 +32,19 @@ AUDIBLE_ENDPOINTS = {
     "uk": "https://api.audible.co.uk/1.0/catalog/products",
 }
 AUDIBLE_REGIONS = tuple(AUDIBLE_ENDPOINTS)
-AUDIBLE_REGIONS_SUFFIXES = {k: tldextract.extract(v).suffix for k, v in AUDIBLE_ENDPOINTS.items()}
+# Public suffix of each region's Audible domain, e.g audible.co.uk
+AUDIBLE_REGIONS_SUFFIXES = {
+    "au": "com.au",
+    "ca": "ca",
+    "de": "de",
+    "es": "es",
+    "fr": "fr",
+    "in": "in",
+    "it": "it",
+    "jp": "co.jp",
+    "us": "com",
+    "uk": "co.uk",
+}
 AUDIBLE_SUFFIXES_REGIONS = {v: k for k, v in AUDIBLE_REGIONS_SUFFIXES.items()}
 AUDNEX_ENDPOINT = "https://api.audnex.us"
 GOODREADS_ENDPOINT = "https://www.goodreads.com/search/index.xml"
@@ -30,8 +53,127 @@ USER_AGENT = (
     "35.0.1916.47 Safari/537.36"
 )
 
+# Shared by all requests so that connections to each host are reused
+http_client = HTTPClient(
+    headers={
+        # Circumvent audnex's user-agent blocking
+        "User-Agent": USER_AGENT,
+    }
+)
+
+# Shared by all requests so that concurrent lookups respect the same limits
+rate_limiter = RateLimiter()
+
+# Runs requests which can be made at the same time as another request, e.g a book's chapters
+# Threads are only started once something is submitted
+_request_executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix="audible-request")
+
+# Persistent cache for Audnex responses, set up by the plugin from its config
+response_cache: ResponseCache | None = None
+
+# Short lived cache of search results, so that searching again for the same book is instant
+search_cache = TTLCache(ttl=600, max_size=256)
+# How long search results are kept in the response cache for, 0 to not persist them
+search_persist_ttl: float = 0
+
+# Counters and latencies of the requests made during this session
+metrics = Metrics()
+
+
+def configure_http_client(
+    connect_timeout: float,
+    read_timeout: float,
+    base_url: str | None = None,
+    replay_mode: str = "off",
+    fixtures_dir: str | None = None,
+) -> None:
+    """
+    Configures the client used by `make_request`.
+
+    `replay_mode` is "off" to make requests normally, "record" to also save every response to
+    `fixtures_dir`, or "replay" to answer requests from `fixtures_dir` without using the network.
+    """
+    global http_client
+    options = {
+        "connect_timeout": connect_timeout,
+        "read_timeout": read_timeout,
+        "headers": http_client.headers,
+        "base_url": base_url,
+    }
+    if replay_mode in ("record", "replay"):
+        from .replay import RecordingClient, ReplayClient
+
+    if replay_mode == "record":
+        http_client = RecordingClient(fixtures_dir, **options)
+    elif replay_mode == "replay":
+        http_client = ReplayClient(fixtures_dir, **options)
+    else:
+        http_client = HTTPClient(**options)
+
+
+def configure_rate_limiter(requests_per_second: float, burst: int, max_retries: int) -> None:
+    rate_limiter.configure(requests_per_second, burst, max_retries)
+
+
+def configure_search_cache(ttl: float, max_size: int, persist_ttl: float = 0) -> None:
+    """
+    Configures the in-memory cache of search results. With `persist_ttl`, search results are also
+    kept in the response cache for that many seconds.
+    """
+    global search_persist_ttl
+    search_cache.ttl = ttl
+    search_cache.max_size = max_size
+    search_cache.clear()
+    search_persist_ttl = persist_ttl
+
+
+def set_response_cache(cache: ResponseCache | None) -> None:
+    global response_cache
+    response_cache = cache
+
 
 def search_audible(keywords: str, region: str) -> dict:
+    with tracer.span("search_audible", keywords=keywords, region=region):
+        cache_key = normalize_search_keywords(keywords)
+        response = get_cached_search(cache_key, region)
+        if response is None:
+            response = make_request(get_audible_search_url(keywords, region))
+            set_cached_search(cache_key, region, response)
+        return json.loads(response)
+
+
+def get_cached_search(key: str, region: str) -> bytes | None:
+    """Returns a search response from the in-memory cache, or the response cache if search results are persisted."""
+    response = search_cache.get((key, region))
+    metrics.record_cache("search", hit=response is not None)
+    if response is None and search_persist_ttl and response_cache is not None:
+        response = response_cache.get(key, region, "search", max_age=search_persist_ttl)
+        metrics.record_cache("response", hit=response is not None)
+        if response is not None:
+            search_cache.set((key, region), response)
+    return response
+
+
+def set_cached_search(key: str, region: str, response: bytes) -> None:
+    search_cache.set((key, region), response)
+    if search_persist_ttl and response_cache is not None:
+        response_cache.set(key, region, "search", response)
+
+
+def normalize_search_keywords(keywords: str) -> str:
+    """Normalizes search keywords so that searches differing only in case or whitespace share a cache entry."""
+    return " ".join(keywords.lower().split())
+
+
+def search_goodreads(api_key: str, keywords: str, use_cache: bool = True) -> "Element":
+    import xml.etree.ElementTree as ET
+
+    with tracer.span("search_goodreads", keywords=keywords):
+        url = get_goodreads_search_url(api_key, keywords)
+        return ET.fromstring(get_response(keywords, "", "goodreads", url, use_cache))
+
+
+def get_audible_search_url(keywords: str, region: str) -> str:
     params = {
         "response_groups": "contributors,product_attrs,product_desc,product_extended_attrs,series",
         "num_results": 10,
@@ -39,23 +181,59 @@ def search_audible(keywords: str, region: str) -> dict:
         "keywords": keywords,
     }
     query = parse.urlencode(params)
-    response = json.loads(make_request(f"{AUDIBLE_ENDPOINTS[region]}?{query}"))
-    return response
+    return f"{AUDIBLE_ENDPOINTS[region]}?{query}"
 
 
-def search_goodreads(api_key: str, keywords: str) -> ET.Element:
+def get_goodreads_search_url(api_key: str, keywords: str) -> str:
     params = {"key": api_key, "q": keywords}
     query = parse.urlencode(params)
-    url = f"{GOODREADS_ENDPOINT}?{query}"
-    return ET.fromstring(make_request(url))
+    return f"{GOODREADS_ENDPOINT}?{query}"
+
+
+def get_book_info(asin: str, region: str, use_cache: bool = True) -> tuple["Book", "BookChapters"]:
+    """Fetches a book and its chapters from Audnex. With `use_cache` false, cached responses are ignored."""
+    from .book import Book, BookChapters
+
+    with tracer.span("get_book_info", asin=asin, region=region):
+        # The book and its chapters are independent, so fetch the chapters while waiting for the book
+        chapters_future = _request_executor.submit(
+            contextvars.copy_context().run, get_audnex_response, asin, region, "chapters", use_cache
+        )
+        try:
+            book_response = json.loads(get_audnex_response(asin, region, "book", use_cache))
+        except BaseException:
+            chapters_future.cancel()
+            raise
+        chapter_response = json.loads(chapters_future.result())
+        book = Book.from_audnex_book(book_response)
+        book_chapters = BookChapters.from_audnex_chapter_info(chapter_response)
+        return book, book_chapters
+
+
+def get_audnex_url(asin: str, region: str, endpoint: str) -> str:
+    path = f"/books/{asin}" if endpoint == "book" else f"/books/{asin}/{endpoint}"
+    return f"{AUDNEX_ENDPOINT}{path}?region={region}&update=1"
 
 
-def get_book_info(asin: str, region: str) -> tuple[Book, BookChapters]:
-    book_response = json.loads(make_request(f"{AUDNEX_ENDPOINT}/books/{asin}?region={region}&update=1"))
-    chapter_response = json.loads(make_request(f"{AUDNEX_ENDPOINT}/books/{asin}/chapters?region={region}&update=1"))
-    book = Book.from_audnex_book(book_response)
-    book_chapters = BookChapters.from_audnex_chapter_info(chapter_response)
-    return book, book_chapters
+def get_audnex_response(asin: str, region: str, endpoint: str, use_cache: bool = True) -> bytes:
+    """Returns the raw Audnex response for a book's "book" or "chapters" endpoint, using the cache if possible."""
+    return get_response(asin, region, endpoint, get_audnex_url(asin, region, endpoint), use_cache)
+
+
+def get_response(key: str, region: str, endpoint: str, url: str, use_cache: bool = True) -> bytes:
+    """
+    Returns the response of `url`, from the response cache under (key, region, endpoint) if it's there.
+    With `use_cache` false, the response is always requested, and replaces the cached one.
+    """
+    if response_cache is not None and use_cache:
+        cached = response_cache.get(key, region, endpoint)
+        metrics.record_cache("response", hit=cached is not None)
+        if cached is not None:
+            return cached
+    response = make_request(url)
+    if response_cache is not None:
+        response_cache.set(key, region, endpoint, response)
+    return response
 
 
 def get_audible_album_url(asin: str, region: str) -> str:
@@ -63,43 +241,114 @@ def get_audible_album_url(asin: str, region: str) -> str:
 
 
 def get_audible_album_region(url: str) -> str | None:
-    suffix = tldextract.extract(url).suffix
-    if suffix in AUDIBLE_SUFFIXES_REGIONS:
-        return AUDIBLE_SUFFIXES_REGIONS[suffix]
-    else:
+    """Returns the region of an Audible url by its suffix, e.g "uk" for `https://www.audible.co.uk/pd/B0036UC2LO`."""
+    if "//" not in url:
+        # urls without a scheme, e.g `audible.co.uk/pd/B0036UC2LO`
+        url = f"//{url}"
+    try:
+        host = parse.urlsplit(url).hostname or ""
+    except ValueError:
         return None
+    labels = host.rstrip(".").split(".")
+    # suffixes are at most 2 labels long, so check e.g "co.uk" before "uk"
+    return AUDIBLE_SUFFIXES_REGIONS.get(".".join(labels[-2:])) or AUDIBLE_SUFFIXES_REGIONS.get(labels[-1])
+
+
+def get_request_labels(url: str) -> tuple[str, str]:
+    """Returns the endpoint and region a request is counted under in `metrics`, e.g ("audnex_book", "us")."""
+    parts = parse.urlsplit(url)
+    host = parts.hostname or ""
+    for region, endpoint in AUDIBLE_ENDPOINTS.items():
+        if host == parse.urlsplit(endpoint).hostname:
+            return "audible_search", region
+    if url.startswith(AUDNEX_ENDPOINT):
+        region = parse.parse_qs(parts.query).get("region", [""])[0]
+        return ("audnex_chapters" if parts.path.endswith("/chapters") else "audnex_book"), region
+    if url.startswith(GOODREADS_ENDPOINT):
+        return "goodreads", ""
+    return "cover_art", ""
 
 
 def make_request(url: str) -> bytes | None:
     """Makes a request to the specified url and returns received response
-    The request will be retried up to 3 times in case of failure.
+    The request will be retried up to `rate_limiter.max_retries` times in case of failure.
     """
-    num_retries = 3
-    sleep_time = 2
+
+    def send() -> tuple[Response, int]:
+        response = http_client.request(url)
+        return response, len(response.body)
+
+    return send_request(url, send).body
+
+
+def download(url: str, file: BinaryIO, headers: dict[str, str] | None = None) -> Response:
+    """
+    Downloads `url` to `file` in chunks, retrying like `make_request`, and returns the response without its body.
+    With conditional request headers, the status of the response may be 304 and `file` is left empty.
+    """
+
+    def send() -> tuple[Response, int]:
+        response = http_client.download(url, file, headers)
+        return response, file.tell() if response.status == 200 else 0
+
+    return send_request(url, send)
+
+
+def send_request(url: str, send: Callable[[], tuple[Response, int]]) -> Response:
+    """
+    Makes a request to `url` with `send`, which returns the response and the number of bytes received.
+    The request is rate limited, retried in case of failure and recorded in `metrics`.
+    """
+    host = parse.urlsplit(url).hostname
+    endpoint, region = get_request_labels(url)
+    num_retries = max(1, rate_limiter.max_retries)
     for n in range(0, num_retries):
+        wait = rate_limiter.reserve(host)
+        if wait > 0:
+            metrics.increment(endpoint, region, "wait_seconds", wait)
+            sleep(wait)
+        start = time.perf_counter()
         try:
-            req = request.Request(
-                url,
-                headers={
-                    # Circumvent audnex's user-agent blocking
-                    "User-Agent": USER_AGENT,
-                },
-            )
-            with request.urlopen(req) as response:
-                return response.read()
+            with tracer.span("request", endpoint=endpoint, region=region, url=url, attempt=n + 1):
+                response, num_bytes = send()
         except HTTPError as e:
+            metrics.record_request(endpoint, region, time.perf_counter() - start, error=True)
+            if e.code == 429:
+                metrics.increment(endpoint, region, "rate_limited")
             if e.code == 404:
                 print(f"Error while requesting {url}: status code {e.code}, {e.reason}")
                 raise e
-            if e.code == 429:
-                reset_seconds = e.headers.get("retry-after")
-                if reset_seconds:
-                    reset_seconds = int(reset_seconds)
-                    print(f"got ratelimited, rate limit resets in {reset_seconds}, updating sleep duration")
-                    sleep_time = reset_seconds + 1
             print(f"Error while requesting {url}, attempt {n + 1}/{num_retries}: status code {e.code}, {e.reason}")
-            if n < num_retries - 1:
-                sleep(sleep_time)
-                sleep_time *= n
-            else:
+            if n == num_retries - 1:
                 raise e
+            metrics.increment(endpoint, region, "retries")
+            sleep_time = get_retry_delay(e, host, n)
+            if sleep_time:
+                metrics.increment(endpoint, region, "wait_seconds", sleep_time)
+                sleep(sleep_time)
+        except Exception:
+            metrics.record_request(endpoint, region, time.perf_counter() - start, error=True)
+            raise
+        else:
+            metrics.record_request(endpoint, region, time.perf_counter() - start, num_bytes)
+            return response
+
+
+def get_retry_delay(e: HTTPError, host: str, attempt: int) -> float:
+    """
+    Returns how long to wait before retrying a failed request.
+
+    If the host rate limited the request, or is unavailable and said when to retry (a 503 with Retry-After),
+    all requests to it are paused instead, so 0 is returned.
+    """
+    sleep_time = rate_limiter.backoff(attempt)
+    if e.code not in (429, 503):
+        return sleep_time
+    reset_seconds = parse_retry_after(e.headers.get("retry-after"))
+    if reset_seconds is not None:
+        print(f"got status {e.code}, retrying in {reset_seconds:.0f}s, pausing requests to {host}")
+        sleep_time = reset_seconds + 1
+    elif e.code == 503:
+        return sleep_time
+    rate_limiter.block(host, sleep_time)
+    return 0
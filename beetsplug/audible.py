@@ -1,35 +1,57 @@
+import contextvars
 import datetime
+import json
 import os
 import pathlib
 import re
+import threading
 import urllib.error
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import suppress
+from functools import cached_property
 from tempfile import NamedTemporaryFile
+from typing import ClassVar
 
 import mediafile
 import yaml
-from beets import importer, ui, util
-from beets.autotag.distance import distance
-from beets.autotag.hooks import AlbumInfo, TrackInfo
+from beets import config, importer, ui, util
+from beets.autotag.distance import VA_ARTISTS, Distance, distance
+from beets.autotag.hooks import AlbumInfo, AlbumMatch, TrackInfo
 from beets.autotag.match import assign_items
+from beets.dbcore import types
+from beets.importer.tasks import albums_in_dir
+from beets.library import Album, Item, ReadError
 from beets.metadata_plugins import MetadataSourcePlugin
+from beets.plugins import apply_item_changes
 from beets.util import PromptChoice
 from beets.util.color import colorize
-from natsort import os_sorted
+from beets.util.units import human_bytes
 
+from .alignment import align_chapters
 from .api import (
     AUDIBLE_REGIONS,
+    configure_http_client,
+    configure_rate_limiter,
+    configure_search_cache,
+    download,
     get_audible_album_region,
     get_audible_album_url,
     get_book_info,
-    make_request,
+    metrics,
     search_audible,
+    set_response_cache,
 )
-from .goodreads import get_original_date
+from .cache import CoverCache, ResponseCache, TTLCache
+from .metrics import load_metrics, save_metrics
+from .profiling import profiler
+from .ranking import PreRanker, normalize
+from .tracing import tracer
 
 
 class Audible(MetadataSourcePlugin):
     data_source = "Audible"
+    item_types: ClassVar[dict[str, types.Type]] = {"is_chapter_data_accurate": types.BOOLEAN}
 
     def __init__(self):
         super().__init__()
@@ -37,6 +59,8 @@ class Audible(MetadataSourcePlugin):
         self.config.add(
             {
                 "fetch_art": True,
+                "prefetch_art": True,
+                "prefetch_art_count": 2,
                 "match_chapters": True,
                 "data_source_mismatch_penalty": 0.0,
                 "write_description_file": True,
@@ -46,20 +70,112 @@ class Audible(MetadataSourcePlugin):
                 "keep_series_reference_in_subtitle": True,
                 "goodreads_apikey": None,
                 "region": "us",
+                "search_regions": [],
+                "lookup_workers": 5,
+                "lazy_candidates": False,
+                "lazy_detail_count": 3,
+                "prerank_threshold": 0.0,
+                "prerank_action": "drop",
+                "max_detail_fetches": 10,
+                "connect_timeout": 10,
+                "read_timeout": 30,
+                "rate_limit": 0,
+                "rate_limit_burst": 10,
+                "max_retries": 3,
+                "cache": True,
+                "cache_path": None,
+                "cache_ttl": 7 * 24 * 60 * 60,
+                "cache_max_entries": 20000,
+                "cover_cache": True,
+                "cover_cache_path": None,
+                "cover_cache_ttl": 30 * 24 * 60 * 60,
+                "cover_cache_max_mb": 200,
+                "search_cache_ttl": 600,
+                "search_cache_size": 256,
+                "search_cache_persist_ttl": 24 * 60 * 60,
+                "stats": False,
+                "stats_path": None,
+                "stats_file": None,
+                "trace_file": None,
+                "profile_dir": None,
+                # development options, see development.md
+                "replay_mode": "off",
+                "replay_dir": "audible_fixtures",
+                "api_base_url": None,
             }
         )
         self.config["goodreads_apikey"].redact = True
         # Check that a 'region' value in the config is one of the provided choices
         self.config["region"].as_choice(AUDIBLE_REGIONS)
+        for region in self.config["search_regions"].as_str_seq():
+            if region not in AUDIBLE_REGIONS:
+                raise ui.UserError(f"audible: unknown region {region!r} in search_regions")
+        self.config["prerank_action"].as_choice(("defer", "drop"))
+        # Scores search results before their details are fetched, can be replaced to change the ranking
+        self.preranker = PreRanker()
         # Mapping of asin to cover art urls
         self.cover_art_urls = {}
         # stores paths of downloaded cover art to be used during import
         self.cover_art = {}
+        # `TaskContext` of each group of items being imported, see `get_task_context`
+        self.task_contexts = TTLCache(ttl=60 * 60, max_size=32)
+
+        replay_mode = self.config["replay_mode"].as_choice(("off", "record", "replay"))
+        configure_http_client(
+            connect_timeout=self.config["connect_timeout"].as_number(),
+            read_timeout=self.config["read_timeout"].as_number(),
+            base_url=self.config["api_base_url"].get(),
+            replay_mode=replay_mode,
+            fixtures_dir=self.config["replay_dir"].as_filename() if replay_mode != "off" else None,
+        )
+        configure_rate_limiter(
+            requests_per_second=self.config["rate_limit"].as_number(),
+            burst=self.config["rate_limit_burst"].get(int),
+            max_retries=self.config["max_retries"].get(int),
+        )
+        configure_search_cache(
+            ttl=self.config["search_cache_ttl"].as_number(),
+            max_size=self.config["search_cache_size"].get(int),
+            persist_ttl=self.config["search_cache_persist_ttl"].as_number(),
+        )
+
+        self.response_cache = None
+        if self.config["cache"].get(bool):
+            self.response_cache = ResponseCache(
+                self.get_cache_path(),
+                ttl=self.config["cache_ttl"].get(int),
+                max_entries=self.config["cache_max_entries"].get(int),
+            )
+        set_response_cache(self.response_cache)
+
+        self.cover_cache = None
+        if self.config["cover_cache"].get(bool):
+            self.cover_cache = CoverCache(
+                self.get_cover_cache_path(),
+                ttl=self.config["cover_cache_ttl"].get(int),
+                max_size=self.config["cover_cache_max_mb"].get(int) * 1024 * 1024,
+            )
+        # downloaded cover art which isn't in the cover cache, and is removed once it's been used
+        self.temp_cover_art = set()
+        # Mapping of cover art urls to background downloads of them, see `prefetch_art`
+        self.art_prefetches = {}
+        # Mapping of task keys to the urls prefetched for them, across every search of the task
+        self.task_art_prefetches = defaultdict(set)
+        self.art_prefetches_lock = threading.Lock()
+        self.art_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="audible-art")
+
+        if self.config["trace_file"].get():
+            tracer.enable()
+        if self.config["profile_dir"].get():
+            profiler.enable(self.config["profile_dir"].as_filename())
 
         self.register_listener("write", self.on_write)
         self.register_listener("import_task_files", self.on_import_task_files)
         self.register_listener("album_matched", self.on_album_matched)
+        self.register_listener("import_task_choice", self.on_import_task_choice)
         self.register_listener("before_choose_candidate", self.before_choose_candidate_event)
+        self.register_listener("import", self.on_import)
+        self.register_listener("cli_exit", self.on_cli_exit)
 
         if self.config["fetch_art"]:
             self.import_stages = [self.fetch_art]
@@ -124,10 +240,295 @@ class Audible(MetadataSourcePlugin):
         region = mediafile.MediaField()
         self.add_media_field("region", region)
 
+    def get_cache_path(self) -> str:
+        if self.config["cache_path"].get():
+            return self.config["cache_path"].as_filename()
+        return os.path.join(config.config_dir(), "audible_cache.db")
+
+    def get_cover_cache_path(self) -> str:
+        if self.config["cover_cache_path"].get():
+            return self.config["cover_cache_path"].as_filename()
+        return os.path.join(config.config_dir(), "audible_covers")
+
+    def commands(self) -> list[ui.Subcommand]:
+        cache_cmd = ui.Subcommand("audible-cache", help="manage the caches of Audnex responses and cover art")
+        cache_cmd.parser.usage += " stats|clear|vacuum"
+        cache_cmd.func = self.cache_command
+
+        stats_cmd = ui.Subcommand("audible-stats", help="show statistics of requests made by the Audible plugin")
+        stats_cmd.parser.add_option("--json", action="store_true", help="print the statistics as JSON")
+        stats_cmd.parser.add_option("--reset", action="store_true", help="reset the statistics")
+        stats_cmd.func = self.stats_command
+
+        prefetch_cmd = ui.Subcommand(
+            "audible-prefetch", help="fetch data from Audible for the books in a directory ahead of importing them"
+        )
+        prefetch_cmd.parser.usage += " DIR..."
+        prefetch_cmd.parser.add_option(
+            "-j", "--jobs", type="int", default=8, help="number of books looked up at the same time, default 8"
+        )
+        prefetch_cmd.func = self.prefetch_command
+
+        refresh_cmd = ui.Subcommand(
+            "audible-refresh", help="update the metadata of albums in the library from Audible, using their ASIN"
+        )
+        refresh_cmd.parser.add_option(
+            "-p", "--pretend", action="store_true", help="show the changes without applying them"
+        )
+        refresh_cmd.parser.add_option(
+            "-m", "--move", action="store_true", dest="move", help="move files in the library directory"
+        )
+        refresh_cmd.parser.add_option(
+            "-M", "--nomove", action="store_false", dest="move", help="don't move files in library"
+        )
+        refresh_cmd.parser.add_option(
+            "-W",
+            "--nowrite",
+            action="store_false",
+            default=None,
+            dest="write",
+            help="don't write updated metadata to files",
+        )
+        refresh_cmd.parser.add_option(
+            "-j", "--jobs", type="int", default=8, help="number of books looked up at the same time, default 8"
+        )
+        refresh_cmd.func = self.refresh_command
+        return [cache_cmd, stats_cmd, prefetch_cmd, refresh_cmd]
+
+    def cache_command(self, lib, opts, args) -> None:
+        if len(args) != 1 or args[0] not in ("stats", "clear", "vacuum"):
+            raise ui.UserError("usage: beet audible-cache stats|clear|vacuum")
+        if self.response_cache is None and self.cover_cache is None:
+            raise ui.UserError("the Audible response and cover caches are disabled")
+
+        action = args[0]
+        if action == "clear":
+            if self.response_cache is not None:
+                removed = self.response_cache.clear()
+                ui.print_(f"Removed {removed} cached responses.")
+            if self.cover_cache is not None:
+                removed = self.cover_cache.clear()
+                ui.print_(f"Removed {removed} cached covers.")
+        elif action == "vacuum":
+            if self.response_cache is None:
+                raise ui.UserError("the Audible response cache is disabled")
+            removed = self.response_cache.vacuum()
+            ui.print_(f"Removed {removed} expired responses.")
+        else:
+            if self.response_cache is not None:
+                stats = self.response_cache.stats()
+                ui.print_(f"Path: {stats['path']}")
+                ui.print_(f"Entries: {stats['entries']} ({stats['expired']} expired)")
+                for endpoint, count in sorted(stats["by_endpoint"].items()):
+                    ui.print_(f"  {endpoint}: {count}")
+                ui.print_(f"Cached data: {human_bytes(stats['size_bytes'])}")
+                ui.print_(f"Database size: {human_bytes(stats['file_size_bytes'])}")
+            if self.cover_cache is not None:
+                stats = self.cover_cache.stats()
+                ui.print_(f"Covers path: {stats['path']}")
+                ui.print_(f"Covers: {stats['images']} images for {stats['urls']} urls")
+                ui.print_(f"Covers size: {human_bytes(stats['size_bytes'])}")
+
+    def get_stats_path(self) -> str:
+        if self.config["stats_path"].get():
+            return self.config["stats_path"].as_filename()
+        return os.path.join(config.config_dir(), "audible_stats.json")
+
+    def stats_command(self, lib, opts, args) -> None:
+        if opts.reset:
+            with suppress(FileNotFoundError):
+                os.remove(self.get_stats_path())
+            metrics.reset()
+            ui.print_("Reset the Audible plugin's statistics.")
+            return
+
+        # totals of previous sessions, plus anything from this one which isn't saved yet
+        totals = load_metrics(self.get_stats_path())
+        totals.merge(metrics.to_dict())
+        if opts.json:
+            ui.print_(json.dumps(totals.to_dict(), indent=2))
+            return
+        if totals.is_empty():
+            if self.config["stats"].get(bool):
+                ui.print_("No requests recorded yet.")
+            else:
+                ui.print_("No requests recorded yet. Set the audible `stats` option to keep totals across sessions.")
+            return
+
+        ui.print_(
+            f"{'endpoint':16} {'region':6} {'requests':>8} {'errors':>6} {'retries':>7} {'429s':>5}"
+            f" {'data':>9} {'waited':>8} {'mean':>8} {'p50':>8} {'p95':>8} {'max':>8}"
+        )
+        for (endpoint, region), counters in sorted(totals.requests.items()):
+            latency = totals.latencies[(endpoint, region)]
+            mean = latency.total_ms / latency.count if latency.count else 0
+            ui.print_(
+                f"{endpoint:16} {region or '-':6} {counters['requests']:8.0f} {counters['errors']:6.0f}"
+                f" {counters['retries']:7.0f} {counters['rate_limited']:5.0f} {human_bytes(counters['bytes']):>9}"
+                f" {counters['wait_seconds']:7.1f}s {mean:6.0f}ms {latency.percentile(50):6.0f}ms"
+                f" {latency.percentile(95):6.0f}ms {latency.max_ms:6.0f}ms"
+            )
+        for cache, counters in sorted(totals.caches.items()):
+            lookups = counters["hits"] + counters["misses"]
+            ui.print_(
+                f"{cache} cache: {counters['hits']} hits, {counters['misses']} misses"
+                f" ({counters['hits'] / lookups:.0%} hit rate)"
+            )
+
+    def prefetch_command(self, lib, opts, args) -> None:
+        if not args:
+            raise ui.UserError("no directory to prefetch given")
+        if self.response_cache is None:
+            raise ui.UserError("the Audible response cache is disabled, so there is nowhere to keep prefetched data")
+
+        books = []
+        for path in args:
+            for _, paths in albums_in_dir(util.normpath(path)):
+                items = []
+                for p in paths:
+                    with suppress(ReadError):
+                        items.append(Item.from_path(p))
+                if items:
+                    books.append(items)
+        ui.print_(f"Prefetching {len(books)} books.")
+
+        requests_before = sum(c["requests"] for c in metrics.requests.values())
+        with ThreadPoolExecutor(max_workers=max(1, opts.jobs), thread_name_prefix="audible-prefetch") as executor:
+            futures = [executor.submit(self.prefetch_book, items) for items in books]
+            for items, future in zip(books, futures, strict=True):
+                folder = get_task_key(items)
+                try:
+                    count = future.result()
+                except Exception as e:
+                    ui.print_(f"{folder}: failed, {e}")
+                    continue
+                if count is None:
+                    ui.print_(f"{folder}: skipped, it has a metadata.yml file")
+                else:
+                    ui.print_(f"{folder}: {count} candidates")
+        requests = sum(c["requests"] for c in metrics.requests.values()) - requests_before
+        ui.print_(f"Done, made {requests:.0f} requests.")
+
+    def refresh_command(self, lib, opts, args) -> None:
+        move = ui.should_move(opts.move)
+        write = ui.should_write(opts.write)
+        region = self.config["region"].as_choice(AUDIBLE_REGIONS)
+
+        books = []
+        for album in lib.albums(args):
+            items = list(album.items())
+            if not items or album.get("data_source") != self.data_source:
+                continue
+            asin = album.get("asin") or items[0].get("asin") or album.get("catalognum")
+            if not asin:
+                self._log.info("Skipping album {0}, it has no ASIN", album)
+                continue
+            books.append((album, items, asin, get_item_region(items[0]) or region))
+        ui.print_(f"Refreshing {len(books)} albums.")
+
+        changed = unchanged = failed = 0
+        jobs = max(1, opts.jobs)
+        with ThreadPoolExecutor(max_workers=jobs, thread_name_prefix="audible-refresh") as executor:
+            # look up a few batches ahead, without keeping the data of the whole library in memory
+            batch_size = jobs * 4
+            for start in range(0, len(books), batch_size):
+                batch = books[start : start + batch_size]
+                futures = [executor.submit(self.get_refreshed_album_info, asin, r) for _, _, asin, r in batch]
+                for (album, items, asin, _), future in zip(batch, futures, strict=True):
+                    try:
+                        album_info = future.result()
+                    except Exception as e:
+                        ui.print_(f"{album}: failed to fetch {asin}, {e}")
+                        failed += 1
+                        continue
+                    if self.apply_refreshed_album_info(lib, album, items, album_info, move, write, opts.pretend):
+                        changed += 1
+                    else:
+                        unchanged += 1
+        ui.print_(f"Done, {changed} albums changed, {unchanged} unchanged, {failed} failed.")
+
+    def get_refreshed_album_info(self, asin, region) -> AlbumInfo:
+        # the cache would return what was imported or prefetched recently, so the book is fetched again
+        album_info = self.get_album_info(asin, region, use_cache=False)
+        set_album_comments(album_info)
+        return album_info
+
+    def apply_refreshed_album_info(self, lib, album, items, album_info, move, write, pretend) -> bool:
+        """
+        Applies the metadata of a book to the items of an album already in the library, only storing and
+        writing the items whose fields changed. Returns whether any of them changed.
+        """
+        if self.maybe_align_tracks_with_items(album_info, items) is not None:
+            # the tracks were made from the files in their natural order, and are numbered in that order,
+            # which isn't necessarily how the files were numbered on import
+            mapping = dict(zip(self.get_task_context(items).sorted_items, album_info.tracks, strict=True))
+        elif len(album_info.tracks) == len(items):
+            # the files were matched to these tracks on import and numbered in the same order
+            sorted_items = sorted(self.get_task_context(items).sorted_items, key=lambda i: (i.disc or 0, i.track or 0))
+            mapping = dict(zip(sorted_items, album_info.tracks, strict=True))
+        else:
+            mapping = dict(assign_items(items, album_info.tracks)[0])
+        set_chapter_titles(album_info)
+
+        changed = False
+        # like `AlbumMatch.apply_metadata`, which isn't used so that `album_matched` isn't sent again
+        with lib.transaction():
+            for item, track in mapping.items():
+                item.update(track.merge_with_album(album_info))
+            for item in items:
+                if not ui.show_model_changes(item):
+                    continue
+                changed = True
+                apply_item_changes(lib, item, move, pretend, write)
+                if not pretend:
+                    for key in Album.item_keys:
+                        album[key] = item[key]
+            if changed and not pretend:
+                album.store()
+                if move and lib.directory in util.ancestry(items[0].path):
+                    album.move()
+        return changed
+
+    def prefetch_book(self, items) -> int | None:
+        """
+        Fetches the data an import of a book's files would need into the caches, like `candidates` does.
+        Returns the number of candidates found, or None for books with a metadata.yml file.
+        """
+        if (pathlib.Path(items[0].path.decode()).parent / "metadata.yml").is_file():
+            return None
+
+        # the same metadata beets searches with during import
+        likelies, consensus = util.get_most_common_tags(items)
+        artist, album = likelies["artist"], likelies["album"]
+        va_likely = not consensus["artist"] or artist.lower() in VA_ARTISTS or any(i.comp for i in items)
+        query, regions = self.get_search_query(items, artist, album, va_likely)
+        runtime = self.get_task_context(items).runtime
+        albums = self.get_albums(query, regions, album=album, artist=None if va_likely else artist, runtime=runtime)
+
+        if self.cover_cache is not None and self.config["fetch_art"]:
+            for album_info in albums[: self.config["prefetch_art_count"].get(int)]:
+                if album_info.get("cover_url"):
+                    try:
+                        self.fetch_image(album_info.cover_url)
+                    except Exception:
+                        self._log.debug("Error while prefetching art from {0}", album_info.cover_url, exc_info=True)
+        return len(albums)
+
     def candidates(self, items, artist, album, va_likely) -> list[AlbumInfo]:
         """Returns a list of AlbumInfo objects for Audible search results
         matching an album and artist (if not various).
         """
+        task_key = get_task_key(items)
+        with (
+            profiler.profile(task_key),
+            tracer.task(task_key),
+            tracer.span("candidates", album=album, artist=artist, files=len(items)),
+        ):
+            albums = self.get_candidates(items, artist, album, va_likely)
+            self.prefetch_art(task_key, albums)
+            return albums
+
+    def get_candidates(self, items, artist, album, va_likely) -> list[AlbumInfo]:
         folder_path = pathlib.Path(items[0].path.decode()).parent
         yml_metadata_file_path = folder_path / "metadata.yml"
         if yml_metadata_file_path.is_file():
@@ -140,40 +541,15 @@ class Audible(MetadataSourcePlugin):
                 self._log.error("Error while reading data from metadata.yml", exc_info=True)
                 return []
 
-        if not album and not artist:
-            folder_name = folder_path.name
-            self._log.warning(
-                f"Files missing album and artist tags. Attempting query based on folder name {folder_name}"
-            )
-            query = folder_name
-        else:
-            query = album if va_likely else f"{album} {artist}"
+        query, regions = self.get_search_query(items, artist, album, va_likely)
 
-        # Strip medium information from query, Things like "CD1" and "disk 1"
-        # can also negate an otherwise positive result.
-        query = re.sub(r"(?i)\b(CD|disc)\s*\d+", "", query)
-        # Strip "(unabridged)" or "(abridged)"
-        abridged_indicator = r"(?i)\((unabridged|abridged)\)"
-        query = re.sub(abridged_indicator, "", query)
-
-        # The book level region has a higher priority than the config level.
-        region = get_item_region(items[0])
-        if region is None:
-            region = self.config["region"].get()
-
-        self._log.debug(f"Searching Audible for {query} in the '{region}' region")
-        albums = self.get_albums(query, region)
+        self._log.debug(f"Searching Audible for {query} in the {', '.join(regions)} region(s)")
+        runtime = self.get_task_context(items).runtime
+        albums = self.get_albums(query, regions, album=album, artist=None if va_likely else artist, runtime=runtime)
+        normalized_album_name = normalize(album)
         for a in albums:
             is_chapter_data_accurate = a.is_chapter_data_accurate
-            punctuation = r"[^\w\s\d]"
-            # normalize by removing punctuation, converting to lowercase,
-            # as well as changing multiple consecutive spaces in the string to a single space
-            normalized_book_title = re.sub(punctuation, "", a.album.strip().lower())
-            normalized_book_title = " ".join(normalized_book_title.split())
-            normalized_album_name = re.sub(abridged_indicator, "", album.strip().lower())
-            normalized_album_name = re.sub(punctuation, "", normalized_album_name)
-
-            normalized_album_name = " ".join(normalized_album_name.split())
+            normalized_book_title = normalize(a.album)
             self._log.debug(f"Matching album name {normalized_album_name} with book title {normalized_book_title}")
             # account for different length strings
             is_likely_match = (
@@ -183,7 +559,13 @@ class Audible(MetadataSourcePlugin):
             # matching doesn't work well if the number of files in the album doesn't match the number of chapters
             # As a workaround, return the same number of tracks as the number of files.
             # This white lie is a workaround but works extraordinarily well
-            if self.config["match_chapters"] and is_likely_match and is_chapterized and not is_chapter_data_accurate:
+            if (
+                self.config["match_chapters"]
+                and is_likely_match
+                and is_chapterized
+                and not is_chapter_data_accurate
+                and not a.get("is_provisional")
+            ):
                 # Logging this for now because this situation
                 # is technically possible (based on the API) but unsure how often it happens
                 self._log.warning(f"Chapter data for {a.album} could be inaccurate.")
@@ -196,9 +578,56 @@ class Audible(MetadataSourcePlugin):
                 )
         return albums
 
+    def get_task_context(self, items) -> "TaskContext":
+        """
+        Returns the `TaskContext` of a group of items, shared by every call made for the same items
+        (in any order), e.g for each candidate of an import task and when one of them is matched.
+        """
+        # the context keeps the items alive, so their ids can't be reused by other items while it's cached
+        key = frozenset(map(id, items))
+        context = self.task_contexts.get(key)
+        if context is None:
+            context = TaskContext(items)
+            self.task_contexts.set(key, context)
+        return context
+
+    def get_search_query(self, items, artist, album, va_likely) -> tuple[str, list[str]]:
+        """Returns the query and the regions, in order of preference, to search Audible with for a book's files."""
+        if not album and not artist:
+            folder_name = pathlib.Path(items[0].path.decode()).parent.name
+            self._log.warning(
+                f"Files missing album and artist tags. Attempting query based on folder name {folder_name}"
+            )
+            query = folder_name
+        else:
+            query = album if va_likely else f"{album} {artist}"
+
+        # Strip medium information from query, Things like "CD1" and "disk 1"
+        # can also negate an otherwise positive result.
+        query = re.sub(r"(?i)\b(CD|disc)\s*\d+", "", query)
+        # Strip "(unabridged)" or "(abridged)"
+        query = re.sub(r"(?i)\((unabridged|abridged)\)", "", query)
+
+        # The book level region has a higher priority than the config level.
+        region = self.get_task_context(items).region
+        if region is not None:
+            return query, [region]
+        return query, self.config["search_regions"].as_str_seq() or [self.config["region"].get()]
+
     def maybe_align_tracks_with_items(self, album_info, items, *, is_likely_match=True) -> int | None:
-        """Override chapter data from Audible with the current file list when needed."""
-        if not is_likely_match or not items or not album_info.tracks:
+        """Override chapter data from Audible with the current file list when needed.
+
+        Each file becomes a track titled after the file, which is what it is matched against. When `match_chapters`
+        is enabled and the number of files differs from the number of chapters, the chapters are also aligned with
+        the files by their lengths: chapters in the same file are merged, and chapters spanning several files are
+        split between them. The resulting titles are kept in each track's `chapter_title`, and replace the file
+        titles once the distance of the match is known (see `align_album_match`).
+        Returns the number of chapters from Audible if the tracks were replaced.
+
+        Provisional albums are left as they are, since their only track is a placeholder for the whole book
+        (see `get_provisional_distance`).
+        """
+        if not is_likely_match or not items or not album_info.tracks or album_info.get("is_provisional"):
             return None
 
         is_chapterized = len(album_info.tracks) == len(items)
@@ -211,20 +640,39 @@ class Audible(MetadataSourcePlugin):
         del common_track_attributes["index"]
         del common_track_attributes["length"]
         del common_track_attributes["title"]
+        common_track_attributes.pop("chapter_title", None)
 
         # Ignore existing track numbers, and instead sort based on file path
         # Use natural sorting instead of lexigraphical to avoid this order:
         # chapter 1, 10, 12, ..., 19, 2, etc
         # This does work correctly when the album has multiple disks
-        # using the bytestring_path function from Beets is needed for correctness
-        # I was noticing inaccurate sorting if using str to convert paths to strings
-        naturally_sorted_items = os_sorted(items, key=lambda i: util.bytestring_path(i.path))
+        chapters = album_info.tracks
+        naturally_sorted_items = self.get_task_context(items).sorted_items
         album_info.tracks = [
             TrackInfo(**common_track_attributes, title=item.title, length=item.length, index=i + 1)
             for i, item in enumerate(naturally_sorted_items)
         ]
+        if self.config["match_chapters"]:
+            segments = align_chapters(
+                [item.length or 0 for item in naturally_sorted_items], [c.length for c in chapters]
+            )
+            if segments is not None:
+                chapter_titles = [c.title for c in chapters]
+                for track, segment in zip(album_info.tracks, segments, strict=True):
+                    track.chapter_title = segment.get_title(chapter_titles)
         return chapter_count_from_audible
 
+    def assign_items_to_tracks(self, album_info, items) -> tuple[dict, list, list]:
+        """
+        Returns the mapping of items to tracks, unmatched items and unmatched tracks of an album,
+        aligning its tracks with the items first if needed.
+        """
+        if self.maybe_align_tracks_with_items(album_info, items) is not None:
+            # there's a track for each file, in the same order
+            return dict(zip(self.get_task_context(items).sorted_items, album_info.tracks, strict=True)), [], []
+        item_info_pairs, extra_items, extra_tracks = assign_items(items, album_info.tracks)
+        return dict(item_info_pairs), extra_items, extra_tracks
+
     def get_album_from_yaml_metadata(self, data, items) -> AlbumInfo:
         """Returns an `AlbumInfo` object by populating it with details from metadata.yml"""
         title = data["title"]
@@ -267,7 +715,7 @@ class Audible(MetadataSourcePlugin):
         }
         track_attributes = {**common_attributes, "composers": data["narrators"]}
 
-        naturally_sorted_items = os_sorted(items, key=lambda i: util.bytestring_path(i.path))
+        naturally_sorted_items = self.get_task_context(items).sorted_items
         # populate tracks by using some of the info from the files being imported
         tracks = [
             TrackInfo(
@@ -314,23 +762,30 @@ class Audible(MetadataSourcePlugin):
         asin = album_id
         self._log.debug(f"Searching for book {asin}")
         try:
-            return self.get_album_info(asin, self.config["region"].get())
+            with profiler.profile(asin):
+                album_info = self.get_album_info(asin, self.config["region"].get())
+                set_album_comments(album_info)
+                return album_info
         except Exception:
             # TODO: handle errors properly and distinguish between general errors and 404s
             self._log.debug(f"Exception while getting book {asin}", exc_info=True)
             return None
 
-    def get_albums(self, query, region) -> list[AlbumInfo]:
-        """Returns a list of AlbumInfo objects for an Audible search query."""
+    def get_albums(self, query, regions, album=None, artist=None, runtime=None) -> list[AlbumInfo]:
+        """Returns a list of AlbumInfo objects for an Audible search query in one or more regions.
 
+        `album`, `artist` and `runtime` (the total length of the files in seconds) are used to rank
+        search results before their details are fetched.
+        """
+        if isinstance(regions, str):
+            regions = [regions]
         try:
-            results = search_audible(query, region)
+            products, product_regions = self.search_regions(query, regions)
         except Exception:
             self._log.warning("Could not connect to Audible API while searching for {0!r}", query, exc_info=True)
             return []
 
         try:
-            products = results["products"]
             today = datetime.datetime.now().strftime("%Y-%m-%d")
             products_without_unreleased_entries = [p for p in products if p["release_date"] <= today]
             if len(products_without_unreleased_entries) < len(products):
@@ -339,22 +794,132 @@ class Audible(MetadataSourcePlugin):
                     f"Excluded {len(products) - len(products_without_unreleased_entries)} books which have"
                     f" not been released from consideration."
                 )
-            out = []
-            for p in products_without_unreleased_entries:
-                try:
-                    out.append(self.get_album_info(p["asin"], region))
-                except urllib.error.HTTPError:
-                    self._log.debug("Error while fetching book information from Audnex", exc_info=True)
-            return out
         except Exception:
             self._log.warning("Error while fetching book information from Audnex", exc_info=True)
             return []
+        return self.get_ranked_album_infos(
+            products_without_unreleased_entries, product_regions, album or query, artist, runtime
+        )
+
+    def search_regions(self, query, regions) -> tuple[list[dict], dict[str, str]]:
+        """Searches Audible in several regions at the same time, merging the results by ASIN.
+
+        Books found in more than one region are kept once, from the first of `regions` they were found in,
+        and results are ordered by region and then by their order in that region's search results.
+        Returns the products, along with the region each was found in by ASIN. Only raises if every
+        search failed.
+        """
+        if len(regions) == 1:
+            results = [search_audible(query, regions[0])]
+        else:
+            with ThreadPoolExecutor(max_workers=len(regions), thread_name_prefix="audible-search") as executor:
+                futures = [
+                    executor.submit(contextvars.copy_context().run, search_audible, query, region) for region in regions
+                ]
+            results = [f.exception() or f.result() for f in futures]
+            if all(isinstance(r, BaseException) for r in results):
+                raise results[0]
+
+        products = []
+        product_regions = {}
+        for region, result in zip(regions, results, strict=True):
+            if isinstance(result, BaseException):
+                self._log.warning(f"Could not search Audible for {query!r} in the '{region}' region", exc_info=result)
+                continue
+            for p in result["products"]:
+                if p["asin"] not in product_regions:
+                    product_regions[p["asin"]] = region
+                    products.append(p)
+        return products, product_regions
+
+    def get_ranked_album_infos(self, products, regions, album, artist, runtime) -> list[AlbumInfo]:
+        """Returns AlbumInfo objects for search results, only fetching details for the best matches.
+
+        Search results are scored by `self.preranker`. Those scoring below `prerank_threshold` are
+        dropped or deferred depending on `prerank_action`, and at most `max_detail_fetches` results
+        (or `lazy_detail_count` when `lazy_candidates` is enabled) with the highest scores are fetched from Audnex.
+        Deferred results are built from their search results, and are only fetched if chosen during import.
+        The order of the search results is preserved. `regions` maps the ASIN of each result to its region.
+        """
+        threshold = self.config["prerank_threshold"].as_number()
+        can_defer = self.config["lazy_candidates"].get(bool) or self.config["prerank_action"].get() == "defer"
+        max_detail_fetches = max(0, self.config["max_detail_fetches"].get(int))
+        if self.config["lazy_candidates"].get(bool):
+            max_detail_fetches = min(max_detail_fetches, max(0, self.config["lazy_detail_count"].get(int)))
+
+        scores = {p["asin"]: self.preranker.score(p, album, artist, runtime) for p in products}
+        for p in products:
+            self._log.debug(f"Search result {p['asin']} ({p.get('title')}) has a score of {scores[p['asin']]:.2f}")
+        ranked_products = sorted(
+            (p for p in products if scores[p["asin"]] >= threshold), key=lambda p: scores[p["asin"]], reverse=True
+        )
+        detailed_asins = [p["asin"] for p in ranked_products[:max_detail_fetches]]
+        if len(detailed_asins) == len(products):
+            return self.get_album_infos([p["asin"] for p in products], regions)
+
+        detailed_albums = {a.album_id: a for a in self.get_album_infos(detailed_asins, regions)}
+        out = []
+        for p in products:
+            asin = p["asin"]
+            if asin in detailed_albums:
+                out.append(detailed_albums[asin])
+            elif asin in detailed_asins:
+                # fetching its details failed, which has already been logged
+                continue
+            elif not can_defer:
+                self._log.debug(f"Dropping search result {asin} ({p.get('title')})")
+            else:
+                try:
+                    out.append(self.get_provisional_album_info(p, regions[asin]))
+                except Exception:
+                    self._log.warning(f"Error while reading search result for {asin}", exc_info=True)
+        return out
+
+    def get_album_infos(self, asins, regions) -> list[AlbumInfo]:
+        """Returns AlbumInfo objects for several books, fetched concurrently from the region of each in `regions`.
+
+        The order of `asins` is preserved, and books which could not be fetched are left out.
+        """
+        if not asins:
+            return []
+        workers = max(1, self.config["lookup_workers"].get(int))
+        with ThreadPoolExecutor(max_workers=min(workers, len(asins))) as executor:
+            futures = [
+                executor.submit(contextvars.copy_context().run, self.get_album_info, asin, regions[asin])
+                for asin in asins
+            ]
+        results = [f.exception() or f.result() for f in futures]
+
+        out = []
+        for asin, result in zip(asins, results, strict=True):
+            if isinstance(result, urllib.error.HTTPError):
+                self._log.debug(f"Error while fetching book information for {asin} from Audnex", exc_info=result)
+            elif isinstance(result, BaseException):
+                self._log.warning(f"Error while fetching book information for {asin} from Audnex", exc_info=result)
+            else:
+                out.append(result)
+        return out
 
-    def get_album_info(self, asin, region) -> AlbumInfo:
-        """Returns an AlbumInfo object for a book given its asin."""
+    def get_album_info(self, asin, region, *, use_cache=True) -> AlbumInfo:
+        """Returns an AlbumInfo object for a book given its asin, skipping the response cache without `use_cache`."""
 
-        (book, chapters) = get_book_info(asin, region)
+        (book, chapters) = get_book_info(asin, region, use_cache)
+        return self.get_album_info_from_book(asin, book, chapters, use_cache=use_cache)
 
+    def get_provisional_album_info(self, product, region) -> AlbumInfo:
+        """Returns an AlbumInfo object built only from an Audible search result, without fetching chapters."""
+        from .book import Book, BookChapters
+
+        book = Book.from_audible_product(product, region)
+        chapters = BookChapters.from_runtime(book.asin, book.title, book.runtime_length_min * 60 * 1000)
+        return self.get_album_info_from_book(book.asin, book, chapters, is_provisional=True)
+
+    def get_album_info_from_book(self, asin, book, chapters, *, is_provisional=False, use_cache=True) -> AlbumInfo:
+        """Returns an AlbumInfo object for a book and its chapters fetched from Audnex.
+
+        Provisional AlbumInfo objects are marked with `is_provisional`, and their details are fetched
+        from Audnex if they are chosen during import.
+        """
         title = book.title
         subtitle = book.subtitle
 
@@ -406,7 +971,6 @@ class Audible(MetadataSourcePlugin):
         authors_and_narrators = ", ".join([authors, narrators])
         artists = authors_and_narrators if self.config["include_narrator_in_artists"] else authors
 
-        description = book.summary_markdown
         cover_url = book.image_url
         genres = [g.name for g in book.genres]
 
@@ -421,7 +985,9 @@ class Audible(MetadataSourcePlugin):
             "genres": genres,
             "series_name": series_name,
             "series_position": series_position,
-            "comments": description,
+            # converting the summary to markdown is slow, so it's only done once a candidate is chosen,
+            # see `set_album_comments`
+            "comments": None,
             "data_source": self.data_source,
             "subtitle": subtitle,
             "catalognum": asin,
@@ -449,20 +1015,24 @@ class Audible(MetadataSourcePlugin):
         month = int(release_date[5:7])
         day = int(release_date[8:10])
 
-        self.cover_art_urls[asin] = cover_url
+        if cover_url:
+            self.cover_art_urls[asin] = cover_url
 
         original_year = year
         original_month = month
         original_day = day
 
-        if self.config["goodreads_apikey"]:
-            original_date = get_original_date(self, asin, authors, title)
+        if self.config["goodreads_apikey"] and not is_provisional:
+            from .goodreads import get_original_date
+
+            with tracer.span("goodreads", asin=asin):
+                original_date = get_original_date(self, asin, authors, title, use_cache)
             if original_date.get("year") is not None:
                 original_year = original_date.get("year")
                 original_month = original_date.get("month")
                 original_day = original_date.get("day")
 
-        return AlbumInfo(
+        album_info = AlbumInfo(
             tracks=tracks,
             album=title,
             album_id=asin,
@@ -482,6 +1052,9 @@ class Audible(MetadataSourcePlugin):
             label=book.publisher,
             **common_attributes,
         )
+        if is_provisional:
+            album_info.is_provisional = True
+        return album_info
 
     def track_for_id(self, track_id: str) -> None:
         self._log.debug("Searching for track {}", track_id)
@@ -515,6 +1088,12 @@ class Audible(MetadataSourcePlugin):
                 tags["mvi"] = int(tags.get("series_position"))
 
     def fetch_art(self, session, task) -> None:
+        task_key = get_task_key(task.items)
+        with profiler.profile(task_key), tracer.task(task_key), tracer.span("fetch_art"):
+            self.fetch_task_art(task)
+            self.discard_prefetched_art(task)
+
+    def fetch_task_art(self, task) -> None:
         # Only fetch art for albums
         if task.is_album:
             if task.album.artpath and os.path.isfile(task.album.artpath):
@@ -531,29 +1110,152 @@ class Audible(MetadataSourcePlugin):
                 self._log.debug(f"No cover art found for {title} by {author}.")
                 return
 
+            # the cover is used once the files are imported, so it has to stay in the cover cache until then
+            self.hold_cover(cover_url)
             try:
-                cover_path = self.fetch_image(cover_url)
-                self.cover_art[task] = cover_path
+                cover_path = self.collect_prefetched_art(cover_url) or self.fetch_image(cover_url)
+                self.cover_art[task] = cover_url, cover_path
             except Exception:
+                self.release_cover(cover_url)
                 self._log.warning(
                     f"Error while downloading cover art for {title} by {author} from {cover_url}", exc_info=True
                 )
 
+    def prefetch_art(self, task_key, album_infos) -> None:
+        """Starts downloading the cover art of the first `prefetch_art_count` candidates in the background."""
+        if not self.config["fetch_art"] or not self.config["prefetch_art"]:
+            return
+        for album_info in album_infos[: self.config["prefetch_art_count"].get(int)]:
+            url = album_info.get("cover_url")
+            if album_info.get("data_source") != self.data_source or not url:
+                continue
+            with self.art_prefetches_lock:
+                self.task_art_prefetches[task_key].add(url)
+                if url not in self.art_prefetches:
+                    self.hold_cover(url)
+                    self.art_prefetches[url] = self.art_executor.submit(
+                        contextvars.copy_context().run, self.fetch_image, url
+                    )
+
+    def cancel_art_prefetches(self, task_key, keep=None) -> None:
+        """Cancels the cover art downloads of rejected candidates which haven't started yet, including those
+        of earlier searches for the same task."""
+        keep_url = keep.get("cover_url") if keep is not None else None
+        with self.art_prefetches_lock:
+            urls = self.task_art_prefetches.pop(task_key, set())
+            # another task may be waiting for the same cover
+            urls.difference_update(*self.task_art_prefetches.values())
+            for url in urls:
+                if url != keep_url and url in self.art_prefetches:
+                    # a download which has already started still finishes, and ends up in the cover cache
+                    self.art_prefetches.pop(url).cancel()
+                    self.release_cover(url)
+
+    def collect_prefetched_art(self, url) -> bytes | None:
+        """Returns the path of cover art downloaded by `prefetch_art`, waiting for it if needed."""
+        with self.art_prefetches_lock:
+            future = self.art_prefetches.pop(url, None)
+        if future is None:
+            return None
+        try:
+            return future.result()
+        except Exception:
+            self._log.debug("prefetching art from {0} failed, downloading it again", url, exc_info=True)
+            return None
+        finally:
+            self.release_cover(url)
+
+    def discard_prefetched_art(self, task) -> None:
+        """Cancels the prefetched cover art of the chosen candidate if fetching the task's art didn't use it,
+        e.g because the album already has art."""
+        match = getattr(task, "match", None)
+        url = match.info.get("cover_url") if isinstance(match, AlbumMatch) else None
+        with self.art_prefetches_lock:
+            future = self.art_prefetches.pop(url, None) if url else None
+        if future is not None:
+            future.cancel()
+            self.release_cover(url)
+
+    def hold_cover(self, url) -> None:
+        """Keeps the cover at `url` in the cover cache until it's released, even if the cache is full."""
+        if self.cover_cache is not None:
+            self.cover_cache.hold(url)
+
+    def release_cover(self, url) -> None:
+        if self.cover_cache is not None:
+            self.cover_cache.release(url)
+
     def fetch_image(self, url) -> bytes:
-        """Downloads an image from a URL and returns a path to the downloaded image."""
-        image = make_request(url)
+        """Downloads an image from a URL and returns a path to the downloaded image.
+
+        With the cover cache enabled, the cached image is used instead if it hasn't changed.
+        """
         ext = url[-4:]  # e.g, ".jpg"
+        if self.cover_cache is not None:
+            return util.bytestring_path(self.fetch_cached_image(url, ext))
+
         with NamedTemporaryFile(suffix=ext, delete=False) as fh:
-            fh.write(image)
+            try:
+                download(url, fh)
+            except BaseException:
+                fh.close()
+                os.remove(fh.name)
+                raise
         self._log.debug("downloaded art to: {0}", util.displayable_path(fh.name))
-        return util.bytestring_path(fh.name)
+        path = util.bytestring_path(fh.name)
+        self.temp_cover_art.add(path)
+        return path
+
+    def fetch_cached_image(self, url, ext) -> str:
+        cached = self.cover_cache.get(url)
+        if cached is not None and cached.is_fresh:
+            self._log.debug("using cached art for {0}", url)
+            return cached.path
+
+        headers = {}
+        if cached is not None:
+            if cached.etag:
+                headers["If-None-Match"] = cached.etag
+            if cached.last_modified:
+                headers["If-Modified-Since"] = cached.last_modified
+        fh = self.cover_cache.create_temp_file(ext)
+        temp_path = fh.name
+        try:
+            with fh:
+                response = download(url, fh, headers)
+            if response.status == 304:
+                self._log.debug("cached art for {0} is unchanged", url)
+                self.cover_cache.mark_checked(url)
+                return cached.path
+            path = self.cover_cache.add(
+                url, temp_path, ext, response.headers.get("ETag"), response.headers.get("Last-Modified")
+            )
+            self._log.debug("downloaded art to: {0}", path)
+            return path
+        except Exception:
+            if cached is None:
+                raise
+            self._log.debug("could not check cached art for {0} for changes, using it anyway", url, exc_info=True)
+            return cached.path
+        finally:
+            with suppress(FileNotFoundError):
+                os.remove(temp_path)
 
     def on_import_task_files(self, task, session) -> None:
-        self.write_book_description_and_narrator(task.imported_items())
-        if self.config["fetch_art"] and task in self.cover_art:
-            cover_path = self.cover_art.pop(task)
-            task.album.set_art(cover_path, True)
-            task.album.store()
+        with tracer.task(get_task_key(task.items)), tracer.span("on_import_task_files"):
+            self.write_book_description_and_narrator(task.imported_items())
+            if self.config["fetch_art"] and task in self.cover_art:
+                cover_url, cover_path = self.cover_art.pop(task)
+                task.album.set_art(cover_path, True)
+                task.album.store()
+                self.remove_temp_cover_art(cover_path)
+                self.release_cover(cover_url)
+
+    def remove_temp_cover_art(self, path) -> None:
+        if path in self.temp_cover_art:
+            self.temp_cover_art.discard(path)
+            with suppress(FileNotFoundError):
+                os.remove(path)
 
     def write_book_description_and_narrator(self, items) -> None:
         """Write description.txt, reader.txt and cover art"""
@@ -575,23 +1277,104 @@ class Audible(MetadataSourcePlugin):
 
     def on_album_matched(self, match) -> None:
         """Adjust final album matches to align tracks with imported files where needed."""
+        with profiler.profile(get_task_key(match.items + match.extra_items)):
+            self.align_album_match(match)
+
+    def align_album_match(self, match) -> None:
         if match.info.data_source != self.data_source:
             return
 
         # AlbumMatch carries matched and unmatched items separately; use both so
         # manual ASIN matches can align against the full import task.
         all_items = match.items + match.extra_items
+        if match.info.get("is_provisional"):
+            # none of the files can be matched until the book's chapters are fetched, see `resolve_provisional_match`
+            match.mapping = {}
+            match.extra_items = all_items
+            match.extra_tracks = list(match.info.tracks)
+            match.distance = get_provisional_distance(all_items, match.info)
+            return
+
         chapter_count_from_audible = self.maybe_align_tracks_with_items(match.info, all_items, is_likely_match=True)
-        if chapter_count_from_audible is None:
+        if chapter_count_from_audible is not None:
+            # the tracks were made from the files in their natural order, so they don't need to be assigned again
+            match.mapping = dict(zip(self.get_task_context(all_items).sorted_items, match.info.tracks, strict=True))
+            match.extra_items = []
+            match.extra_tracks = []
+            match.distance = distance(all_items, match.info, list(match.mapping.items()))
+        # every match is sent through here before it can be applied, e.g by the importer or mbsync,
+        # and its distance is known by now, so the file titles it was based on can be replaced
+        set_chapter_titles(match.info)
+
+    def on_import_task_choice(self, session, task) -> None:
+        """Finish the chosen match, fetching its details if it is provisional."""
+        match = getattr(task, "match", None)
+        self.cancel_art_prefetches(get_task_key(task.items), keep=match.info if isinstance(match, AlbumMatch) else None)
+        if not isinstance(match, AlbumMatch):
             return
+        if match.info.get("is_provisional"):
+            self.resolve_provisional_match(task)
+            if task.match is None:
+                return
+        set_album_comments(task.match.info)
 
-        item_info_pairs, extra_items, extra_tracks = assign_items(all_items, match.info.tracks)
-        match.mapping = dict(item_info_pairs)
-        match.extra_items = extra_items
-        match.extra_tracks = extra_tracks
-        match.distance = distance(all_items, match.info, item_info_pairs)
+    def resolve_provisional_match(self, task) -> None:
+        asin = task.match.info.album_id
+        self._log.debug(f"Fetching details for provisional match {asin}")
+        try:
+            album_info = self.get_album_info(asin, task.match.info.region)
+        except Exception:
+            # the search result only has placeholder chapters, which shouldn't end up in the files
+            self._log.warning(
+                f"Error while fetching details for {asin}, skipping {get_task_key(task.items)}", exc_info=True
+            )
+            task.set_choice(importer.Action.SKIP)
+            return
+
+        items = list(task.items)
+        mapping, extra_items, extra_tracks = self.assign_items_to_tracks(album_info, items)
+        # Creating the match sends the album_matched event, which has nothing left to align
+        task.match = AlbumMatch(
+            distance=distance(items, album_info, list(mapping.items())),
+            info=album_info,
+            mapping=mapping,
+            extra_items=extra_items,
+            extra_tracks=extra_tracks,
+        )
+
+    def on_import(self, lib, paths) -> None:
+        stats_file = self.config["stats_file"].get()
+        if stats_file:
+            save_metrics(metrics, util.normpath(stats_file).decode())
+            self._log.info("wrote request statistics to {}", stats_file)
+
+    def on_cli_exit(self, lib) -> None:
+        self.art_executor.shutdown(cancel_futures=True)
+        # cover art of tasks which were skipped or failed after it was downloaded
+        for path in list(self.temp_cover_art):
+            self.remove_temp_cover_art(path)
+
+        for path in profiler.write():
+            self._log.info("wrote profile to {}", path)
+
+        trace_file = self.config["trace_file"].get()
+        if trace_file:
+            tracer.write(util.normpath(trace_file).decode())
+            self._log.info("wrote trace to {}", trace_file)
+
+        if not self.config["stats"].get(bool) or metrics.is_empty():
+            return
+        try:
+            totals = load_metrics(self.get_stats_path())
+            totals.merge(metrics.to_dict())
+            save_metrics(totals, self.get_stats_path())
+            metrics.reset()
+        except OSError as e:
+            self._log.warning("could not save request statistics: {}", e)
 
     def before_choose_candidate_event(self, session, task) -> list[PromptChoice]:
+        # candidates are now sorted by how well they match, which may differ from the search order
+        self.prefetch_art(get_task_key(task.items), [c.info for c in task.candidates])
         return [PromptChoice("r", "Region switch", self.book_level_region_switch)]
 
     def book_level_region_switch(self, session, task) -> None:
@@ -602,7 +1385,7 @@ class Audible(MetadataSourcePlugin):
         current_config_region_code = self.config["region"].get()
 
         # book level region code
-        book_region_code = get_item_region(task.items[0])
+        book_region_code = self.get_task_context(task.items).region
         if book_region_code is None:
             current_book_region_code = "--"
             ui_current_config_region_code = colorize("text_highlight_minor", current_config_region_code)
@@ -624,6 +1407,7 @@ class Audible(MetadataSourcePlugin):
 
         if region_code in AUDIBLE_REGIONS:
             task.items[0]["region"] = region_code
+            self.get_task_context(task.items).region = region_code
             if current_book_region_code != region_code:
                 color_name = "changed"
                 current_book_region_code = region_code
@@ -633,6 +1417,42 @@ class Audible(MetadataSourcePlugin):
         task.lookup_candidates()
 
 
+class TaskContext:
+    """
+    Data derived from the files of an import task, which is the same for every candidate they're matched with.
+    Each value is computed the first time it's needed, and kept for as long as the context is.
+    """
+
+    def __init__(self, items):
+        self.items = list(items)
+
+    @cached_property
+    def sorted_items(self) -> list:
+        """The items in natural order, see `get_naturally_sorted_items`"""
+        return get_naturally_sorted_items(self.items)
+
+    @cached_property
+    def runtime(self) -> float:
+        """The total length of the files in seconds"""
+        return sum(i.length or 0 for i in self.items)
+
+    @cached_property
+    def region(self) -> str | None:
+        """The book level region, see `get_item_region`"""
+        return get_item_region(self.items[0]) if self.items else None
+
+
+def get_provisional_distance(items, album_info) -> Distance:
+    """
+    Returns the distance of a provisional album from the files being imported. Its only track is a placeholder
+    for the whole book, so none of the files are matched with it. They're compared with the album's details, and
+    every file counts as an unmatched track, which is the same for every provisional album with the same files.
+    This keeps provisional albums from scoring better than albums whose chapters were compared with the files,
+    and beets doesn't apply them without asking, as `match.max_rec` limits albums with unmatched tracks.
+    """
+    return distance(items, album_info, [])
+
+
 def get_item_region(item) -> str | None:
     """Get the value of the 'region' field, if it is available, or can be extracted from 'album_url'."""
     available_field_names = item.keys()
@@ -653,3 +1473,39 @@ def get_item_region(item) -> str | None:
     else:
         result = None
     return result
+
+
+def set_album_comments(album_info) -> None:
+    """Sets the comments of an album from Audible and its tracks to its summary, converted to markdown."""
+    if album_info.get("comments") is not None or album_info.get("summary_html") is None:
+        return
+    from .book import get_summary_markdown
+
+    comments = get_summary_markdown(album_info.summary_html)
+    album_info.comments = comments
+    for track in album_info.tracks:
+        track.comments = comments
+
+
+def set_chapter_titles(album_info) -> None:
+    """Titles tracks aligned with the files of a book after the chapters they contain, see `align_chapters`."""
+    for track in album_info.tracks:
+        chapter_title = track.pop("chapter_title", None)
+        if chapter_title is not None:
+            track.title = chapter_title
+
+
+def get_naturally_sorted_items(items) -> list:
+    """Sorts items by path in natural order, e.g chapter 1, 2, ..., 10 instead of 1, 10, 2."""
+    # imported here so that commands which don't match books don't load natsort
+    from natsort import os_sorted
+
+    # natsort compares bytes as they are, so paths need to be decoded for numbers in them to be sorted naturally
+    return os_sorted(items, key=lambda i: os.fsdecode(util.bytestring_path(i.path)))
+
+
+def get_task_key(items) -> str:
+    """Identifies the import task of a group of items in traces, by the folder of its first file."""
+    if not items:
+        return "unknown"
+    return util.displayable_path(os.path.dirname(items[0].path))
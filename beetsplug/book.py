@@ -1,29 +1,34 @@
+import hashlib
 import re
+import sys
+from array import array
+from dataclasses import dataclass
 
-from markdownify import markdownify as md
+from .cache import TTLCache
+from .tracing import tracer
 
-# This would be much less verbose with dataclasses, only available in Python 3.7+
-# Beets has a minimum Python version requirement of 3.6, hence I'm not using dataclasses here
+# Summaries converted to markdown, keyed by a hash of their HTML
+_markdown_cache = TTLCache(ttl=24 * 60 * 60, max_size=1024)
 
 
+def intern(value: str | None) -> str | None:
+    """Interns short strings which repeat across books, such as names, languages and regions."""
+    return sys.intern(value) if value is not None else None
+
+
+@dataclass(frozen=True, slots=True)
 class Author:
     asin: str | None
     name: str
 
-    def __init__(self, asin, name):
-        self.asin = asin
-        self.name = name
-
 
+@dataclass(frozen=True, slots=True)
 class Genre:
     asin: str
     name: str
 
-    def __init__(self, asin, name):
-        self.asin = asin
-        self.name = name
-
 
+@dataclass(frozen=True, slots=True)
 class Tag:
     """
     Tags associated with the book, e.g "Action & Adventure", "Epic"
@@ -32,89 +37,47 @@ class Tag:
     asin: str
     name: str
 
-    def __init__(self, asin, name):
-        self.asin = asin
-        self.name = name
-
 
+@dataclass(frozen=True, slots=True)
 class Narrator:
     name: str
 
-    def __init__(self, name):
-        self.name = name
-
 
+@dataclass(frozen=True, slots=True)
 class Series:
     asin: str
     name: str
     # Yes, sadly its possible for series to not have a position
     position: str | None  # e.g, "2", "8.5", "1-5"
 
-    def __init__(self, asin, name, position):
-        self.asin = asin
-        self.name = name
-        self.position = position
-
 
+@dataclass(frozen=True, slots=True)
 class Book:
     asin: str
-    authors: list[Author]
+    authors: tuple[Author, ...]
     description: str
-    format_type: str  # e.g, "unabridged"
-    genres: list[Genre]  # may be an empty list
-    image_url: str
+    format_type: str | None  # e.g, "unabridged", missing from some search results
+    genres: tuple[Genre, ...]  # may be empty
+    image_url: str | None  # missing from search results
     language: str
-    narrators: list[Narrator]
-    publisher: str
+    narrators: tuple[Narrator, ...]
+    publisher: str | None
     release_date: str  # yyyy-mm-dd format
     runtime_length_min: int
     series: Series | None
     subtitle: str | None
     summary_html: str
-    summary_markdown: str
-    tags: list[Tag]  # may be an empty list
+    tags: tuple[Tag, ...]  # may be empty
     title: str
     region: str | None
 
-    def __init__(
-        self,
-        asin,
-        authors,
-        description,
-        format_type,
-        genres,
-        image_url,
-        language,
-        narrators,
-        publisher,
-        release_date,
-        runtime_length_min,
-        series,
-        subtitle,
-        summary_html,
-        summary_markdown,
-        tags,
-        title,
-        region,
-    ):
-        self.asin = asin
-        self.authors = authors
-        self.description = description
-        self.format_type = format_type
-        self.genres = genres
-        self.image_url = image_url
-        self.language = language.capitalize()
-        self.narrators = narrators
-        self.publisher = publisher
-        self.release_date = release_date
-        self.runtime_length_min = runtime_length_min
-        self.series = series
-        self.subtitle = subtitle
-        self.summary_html = summary_html
-        self.summary_markdown = summary_markdown
-        self.tags = tags
-        self.title = title
-        self.region = region
+    def __post_init__(self):
+        object.__setattr__(self, "language", intern(self.language.capitalize()))
+
+    @property
+    def summary_markdown(self) -> str:
+        """The summary converted to markdown. Converting is slow, so it's only done when needed."""
+        return get_summary_markdown(self.summary_html)
 
     @staticmethod
     def from_audnex_book(b: dict) -> "Book":
@@ -123,110 +86,213 @@ class Book:
         """
         series_primary = b.get("seriesPrimary")
         if series_primary:
-            pos = series_primary.get("position")
-            if pos:
-                match = re.search(r"[\d.\-]+", pos)
-                series_position = match.group(0) if match else None
-            else:
-                series_position = None
-            series = Series(asin=series_primary["asin"], name=series_primary["name"], position=series_position)
+            series = Series(
+                asin=series_primary["asin"],
+                name=intern(series_primary["name"]),
+                position=parse_series_position(series_primary.get("position")),
+            )
         else:
             series = None
         summary_html = b["summary"]
-        summary_markdown = md(summary_html)
-        # Remove blank lines from the start and end, as well as whitespace from each line
-        normalized_summary_markdown = "\n".join([line.strip() for line in summary_markdown.strip().splitlines()])
         return Book(
             asin=b["asin"],
-            authors=[Author(asin=a.get("asin"), name=a["name"]) for a in b["authors"]],
+            authors=tuple(Author(asin=a.get("asin"), name=intern(a["name"])) for a in b["authors"]),
             description=b["description"],
-            format_type=b["formatType"],
-            genres=[
+            format_type=intern(b["formatType"]),
+            genres=tuple(
                 # API response may not contain genre info
-                Genre(asin=g["asin"], name=g["name"])
+                Genre(asin=g["asin"], name=intern(g["name"]))
                 for g in b.get("genres", [])
                 if g["type"] == "genre"
-            ],
-            image_url=b["image"],
+            ),
+            image_url=b.get("image"),
             language=b["language"],
-            narrators=[Narrator(name=n["name"]) for n in b["narrators"]],
-            publisher=b["publisherName"],
+            narrators=tuple(Narrator(name=intern(n["name"])) for n in b["narrators"]),
+            publisher=intern(b["publisherName"]),
             release_date=b["releaseDate"][:10],  # ignore timestamp from iso8601 string
             runtime_length_min=b["runtimeLengthMin"],
             series=series,
             subtitle=b.get("subtitle"),
             summary_html=summary_html,
-            summary_markdown=normalized_summary_markdown,
-            tags=[
+            tags=tuple(
                 # API response may not contain tag info
-                Tag(asin=g["asin"], name=g["name"])
+                Tag(asin=g["asin"], name=intern(g["name"]))
                 for g in b.get("genres", [])
                 if g["type"] == "tag"
-            ],
+            ),
             title=b["title"],
-            region=b["region"],
+            region=intern(b["region"]),
+        )
+
+    @staticmethod
+    def from_audible_product(p: dict, region: str) -> "Book":
+        """
+        Creates a `Book` from a product in an Audible catalog search result.
+
+        Search results don't include genres, tags or cover art, so those are left empty.
+        """
+        series_list = p.get("series") or []
+        if series_list:
+            series_info = series_list[0]
+            series = Series(
+                asin=series_info.get("asin"),
+                name=intern(series_info["title"]),
+                position=parse_series_position(series_info.get("sequence")),
+            )
+        else:
+            series = None
+        summary_html = p.get("publisher_summary") or ""
+        return Book(
+            asin=p["asin"],
+            authors=tuple(Author(asin=a.get("asin"), name=intern(a["name"])) for a in p.get("authors", [])),
+            description=p.get("merchandising_summary") or "",
+            format_type=intern(p.get("format_type")),
+            genres=(),
+            image_url=None,
+            language=p.get("language") or "english",
+            narrators=tuple(Narrator(name=intern(n["name"])) for n in p.get("narrators", [])),
+            publisher=intern(p.get("publisher_name")),
+            release_date=p["release_date"][:10],
+            runtime_length_min=p.get("runtime_length_min") or 0,
+            series=series,
+            subtitle=p.get("subtitle"),
+            summary_html=summary_html,
+            tags=(),
+            title=p["title"],
+            region=intern(region),
         )
 
 
+def parse_series_position(position: str | None) -> str | None:
+    """Extracts the position from values such as "Book 2" or "1-3"."""
+    if not position:
+        return None
+    match = re.search(r"[\d.\-]+", position)
+    return match.group(0) if match else None
+
+
+def get_summary_markdown(summary_html: str) -> str:
+    """Returns `html_to_markdown(summary_html)`, reusing the result for summaries converted before."""
+    key = hashlib.sha1(summary_html.encode()).digest()
+    summary_markdown = _markdown_cache.get(key)
+    if summary_markdown is None:
+        summary_markdown = html_to_markdown(summary_html)
+        _markdown_cache.set(key, summary_markdown)
+    return summary_markdown
+
+
+def html_to_markdown(summary_html: str) -> str:
+    # imported here, since markdownify and BeautifulSoup take a while to load and most commands don't need them
+    from markdownify import markdownify as md
+
+    with tracer.span("html_to_markdown", length=len(summary_html)):
+        summary_markdown = md(summary_html)
+        # Remove blank lines from the start and end, as well as whitespace from each line
+        return "\n".join([line.strip() for line in summary_markdown.strip().splitlines()])
+
+
+@dataclass(frozen=True, slots=True)
 class Chapter:
     length_ms: int
     start_offset_ms: int
     start_offset_sec: int
     title: str
 
-    def __init__(self, length_ms, start_offset_ms, start_offset_sec, title):
-        self.length_ms = length_ms
-        self.start_offset_ms = start_offset_ms
-        self.start_offset_sec = start_offset_sec
-        self.title = title
-
 
+@dataclass(frozen=True, slots=True)
 class BookChapters:
+    """
+    Chapters of a book. Chapter offsets and lengths are stored in arrays rather than as a `Chapter`
+    per chapter, since books can have hundreds of chapters. `chapters` creates the `Chapter` objects.
+    """
+
     asin: str
     bran_intro_duration_ms: int
     brand_outro_duration_ms: int
-    chapters: list[Chapter]
+    chapter_lengths_ms: array
+    chapter_start_offsets_ms: array
+    chapter_start_offsets_sec: array
+    chapter_titles: tuple[str, ...]
     is_accurate: bool
     runtime_length_ms: int
     runtime_length_sec: int
 
-    def __init__(
-        self,
-        asin,
-        bran_intro_duration_ms,
-        brand_outro_duration_ms,
-        chapters,
-        is_accurate,
-        runtime_length_ms,
-        runtime_length_sec,
-    ):
-        self.asin = asin
-        self.bran_intro_duration_ms = bran_intro_duration_ms
-        self.brand_outro_duration_ms = brand_outro_duration_ms
-        self.chapters = chapters
-        self.is_accurate = is_accurate
-        self.runtime_length_ms = runtime_length_ms
-        self.runtime_length_sec = runtime_length_sec
+    @property
+    def chapters(self) -> list[Chapter]:
+        return [
+            Chapter(
+                length_ms=length_ms, start_offset_ms=start_offset_ms, start_offset_sec=start_offset_sec, title=title
+            )
+            for length_ms, start_offset_ms, start_offset_sec, title in zip(
+                self.chapter_lengths_ms,
+                self.chapter_start_offsets_ms,
+                self.chapter_start_offsets_sec,
+                self.chapter_titles,
+                strict=True,
+            )
+        ]
+
+    @staticmethod
+    def from_chapters(
+        asin: str,
+        bran_intro_duration_ms: int,
+        brand_outro_duration_ms: int,
+        chapters: list[Chapter],
+        is_accurate: bool,
+        runtime_length_ms: int,
+        runtime_length_sec: int,
+    ) -> "BookChapters":
+        return BookChapters(
+            asin=asin,
+            bran_intro_duration_ms=bran_intro_duration_ms,
+            brand_outro_duration_ms=brand_outro_duration_ms,
+            chapter_lengths_ms=array("q", [c.length_ms for c in chapters]),
+            chapter_start_offsets_ms=array("q", [c.start_offset_ms for c in chapters]),
+            chapter_start_offsets_sec=array("q", [c.start_offset_sec for c in chapters]),
+            chapter_titles=tuple(c.title for c in chapters),
+            is_accurate=is_accurate,
+            runtime_length_ms=runtime_length_ms,
+            runtime_length_sec=runtime_length_sec,
+        )
 
     @staticmethod
     def from_audnex_chapter_info(c: dict) -> "BookChapters":
         """
         Creates a `BookChapters` instance from audnex's /book/{asin}/chapters endpoint
         """
+        chapters = c["chapters"]
         return BookChapters(
             asin=c["asin"],
             bran_intro_duration_ms=c["brandIntroDurationMs"],
             brand_outro_duration_ms=c["brandOutroDurationMs"],
+            chapter_lengths_ms=array("q", [int(ch["lengthMs"]) for ch in chapters]),
+            chapter_start_offsets_ms=array("q", [int(ch["startOffsetMs"]) for ch in chapters]),
+            chapter_start_offsets_sec=array("q", [int(ch["startOffsetSec"]) for ch in chapters]),
+            chapter_titles=tuple(ch["title"] for ch in chapters),
+            is_accurate=c["isAccurate"],
+            runtime_length_ms=c["runtimeLengthMs"],
+            runtime_length_sec=c["runtimeLengthSec"],
+        )
+
+    @staticmethod
+    def from_runtime(asin: str, title: str, runtime_length_ms: int) -> "BookChapters":
+        """
+        Creates a `BookChapters` instance with a single chapter spanning the whole book,
+        for books whose chapter data hasn't been fetched
+        """
+        return BookChapters.from_chapters(
+            asin=asin,
+            bran_intro_duration_ms=0,
+            brand_outro_duration_ms=0,
             chapters=[
                 Chapter(
-                    length_ms=c["lengthMs"],
-                    start_offset_ms=c["startOffsetMs"],
-                    start_offset_sec=c["startOffsetSec"],
-                    title=c["title"],
+                    length_ms=runtime_length_ms,
+                    start_offset_ms=0,
+                    start_offset_sec=0,
+                    title=title,
                 )
-                for c in c["chapters"]
             ],
-            is_accurate=c["isAccurate"],
-            runtime_length_ms=c["runtimeLengthMs"],
-            runtime_length_sec=c["runtimeLengthSec"],
+            is_accurate=False,
+            runtime_length_ms=runtime_length_ms,
+            runtime_length_sec=runtime_length_ms // 1000,
         )
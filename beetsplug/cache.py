@@ -0,0 +1,384 @@
+import hashlib
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import Counter, OrderedDict
+from contextlib import suppress
+from typing import BinaryIO
+
+
+class ResponseCache:
+    """
+    Persistent cache of API responses, stored in a SQLite database.
+
+    Entries are keyed by (key, region, endpoint), e.g ("B0036UC2LO", "us", "book").
+    Entries older than `ttl` seconds are treated as missing, and once more than `max_entries`
+    entries are stored the least recently used ones are evicted.
+    """
+
+    # reading an entry only records when it was accessed if that was longer ago than this, so that
+    # most reads don't have to write to the database
+    ACCESS_TIME_RESOLUTION = 60 * 60
+
+    def __init__(self, path: str, ttl: int | None = None, max_entries: int | None = None):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        # The connection is shared between threads, so all access goes through this lock
+        self._lock = threading.Lock()
+        self._conn: sqlite3.Connection | None = None
+
+    def _connection(self) -> sqlite3.Connection:
+        # Opened lazily so that commands which never look up a book don't touch the disk
+        if self._conn is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            # commits don't wait for the disk, at the risk of losing the last few on power loss
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                " key TEXT NOT NULL,"
+                " region TEXT NOT NULL,"
+                " endpoint TEXT NOT NULL,"
+                " body BLOB NOT NULL,"
+                " created_at REAL NOT NULL,"
+                " accessed_at REAL NOT NULL,"
+                " PRIMARY KEY (key, region, endpoint))"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed_at ON responses (accessed_at)")
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def _is_expired(self, created_at: float, now: float) -> bool:
+        return bool(self.ttl) and now - created_at > self.ttl
+
+    def get(self, key: str, region: str, endpoint: str, max_age: float | None = None) -> bytes | None:
+        """
+        Returns the cached response body, or None if it isn't cached or has expired.
+        `max_age` is a shorter TTL for this lookup, for responses which go stale sooner.
+        """
+        with self._lock:
+            conn = self._connection()
+            row = conn.execute(
+                "SELECT body, created_at, accessed_at FROM responses WHERE key = ? AND region = ? AND endpoint = ?",
+                (key, region, endpoint),
+            ).fetchone()
+            if row is None:
+                return None
+            body, created_at, accessed_at = row
+            now = time.time()
+            if self._is_expired(created_at, now) or (max_age is not None and now - created_at > max_age):
+                return None
+            if now - accessed_at > self.ACCESS_TIME_RESOLUTION:
+                conn.execute(
+                    "UPDATE responses SET accessed_at = ? WHERE key = ? AND region = ? AND endpoint = ?",
+                    (now, key, region, endpoint),
+                )
+                conn.commit()
+            return bytes(body)
+
+    def set(self, key: str, region: str, endpoint: str, body: bytes) -> None:
+        with self._lock:
+            conn = self._connection()
+            now = time.time()
+            conn.execute(
+                "INSERT OR REPLACE INTO responses (key, region, endpoint, body, created_at, accessed_at)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (key, region, endpoint, body, now, now),
+            )
+            if self.max_entries:
+                conn.execute(
+                    "DELETE FROM responses WHERE rowid IN"
+                    " (SELECT rowid FROM responses ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                    (self.max_entries,),
+                )
+            conn.commit()
+
+    def stats(self) -> dict:
+        with self._lock:
+            conn = self._connection()
+            entries, size = conn.execute("SELECT COUNT(*), COALESCE(SUM(LENGTH(body)), 0) FROM responses").fetchone()
+            expired = 0
+            if self.ttl:
+                (expired,) = conn.execute(
+                    "SELECT COUNT(*) FROM responses WHERE created_at < ?", (time.time() - self.ttl,)
+                ).fetchone()
+            by_endpoint = dict(conn.execute("SELECT endpoint, COUNT(*) FROM responses GROUP BY endpoint"))
+        return {
+            "path": self.path,
+            "entries": entries,
+            "expired": expired,
+            "size_bytes": size,
+            "file_size_bytes": os.path.getsize(self.path) if os.path.exists(self.path) else 0,
+            "by_endpoint": by_endpoint,
+        }
+
+    def clear(self) -> int:
+        """Removes every entry from the cache and returns the number of removed entries."""
+        with self._lock:
+            conn = self._connection()
+            removed = conn.execute("DELETE FROM responses").rowcount
+            conn.commit()
+            conn.execute("VACUUM")
+            return removed
+
+    def vacuum(self) -> int:
+        """Removes expired entries, compacts the database and returns the number of removed entries."""
+        with self._lock:
+            conn = self._connection()
+            removed = 0
+            if self.ttl:
+                removed = conn.execute("DELETE FROM responses WHERE created_at < ?", (time.time() - self.ttl,)).rowcount
+                conn.commit()
+            conn.execute("VACUUM")
+            return removed
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+class TTLCache:
+    """
+    In-memory cache holding up to `max_size` entries for `ttl` seconds each.
+    The least recently used entries are evicted once the cache is full.
+    """
+
+    def __init__(self, ttl: float, max_size: int):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if time.monotonic() > expires_at:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value) -> None:
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+class CachedCover:
+    path: str
+    etag: str | None
+    last_modified: str | None
+    is_fresh: bool
+
+    def __init__(self, path, etag, last_modified, is_fresh):
+        self.path = path
+        self.etag = etag
+        self.last_modified = last_modified
+        # whether the cover was checked for changes less than `ttl` seconds ago
+        self.is_fresh = is_fresh
+
+
+class CoverCache:
+    """
+    On-disk cache of cover art, stored in `directory`.
+
+    Images are stored under the SHA-256 hash of their content, so the same image at several urls is
+    stored once. An SQLite index maps each url to its image, along with the ETag and Last-Modified
+    headers it was served with, so that it can be checked for changes with a conditional request
+    once it's older than `ttl` seconds. Once the images take up more than `max_size` bytes,
+    the least recently used ones are removed, except for the covers which are held with `hold`.
+    """
+
+    # temporary files older than this are left over from interrupted downloads
+    STALE_TEMP_FILE_AGE = 60 * 60
+
+    def __init__(self, directory: str, ttl: int | None = None, max_size: int | None = None):
+        self.directory = directory
+        self.ttl = ttl
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._conn: sqlite3.Connection | None = None
+        # urls of covers which are being downloaded or are about to be used, see `hold`
+        self._held: Counter[str] = Counter()
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(self.directory, exist_ok=True)
+            conn = sqlite3.connect(os.path.join(self.directory, "index.db"), check_same_thread=False)
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS covers ("
+                " url TEXT PRIMARY KEY,"
+                " digest TEXT NOT NULL,"
+                " ext TEXT NOT NULL,"
+                " size INTEGER NOT NULL,"
+                " etag TEXT,"
+                " last_modified TEXT,"
+                " checked_at REAL NOT NULL,"
+                " accessed_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS covers_accessed_at ON covers (accessed_at)")
+            conn.commit()
+            self._conn = conn
+            self._remove_stale_temp_files()
+        return self._conn
+
+    def _image_path(self, digest: str, ext: str) -> str:
+        return os.path.join(self.directory, digest[:2], f"{digest}{ext}")
+
+    def get(self, url: str) -> CachedCover | None:
+        with self._lock:
+            conn = self._connection()
+            row = conn.execute(
+                "SELECT digest, ext, etag, last_modified, checked_at FROM covers WHERE url = ?", (url,)
+            ).fetchone()
+            if row is None:
+                return None
+            digest, ext, etag, last_modified, checked_at = row
+            path = self._image_path(digest, ext)
+            if not os.path.isfile(path):
+                conn.execute("DELETE FROM covers WHERE url = ?", (url,))
+                conn.commit()
+                return None
+            now = time.time()
+            conn.execute("UPDATE covers SET accessed_at = ? WHERE url = ?", (now, url))
+            conn.commit()
+            is_fresh = not self.ttl or now - checked_at <= self.ttl
+            return CachedCover(path, etag, last_modified, is_fresh)
+
+    def create_temp_file(self, suffix: str = "") -> BinaryIO:
+        """Returns a temporary file in the cache directory to download a cover to, before passing it to `add`."""
+        os.makedirs(self.directory, exist_ok=True)
+        return tempfile.NamedTemporaryFile(dir=self.directory, prefix="download-", suffix=f"{suffix}.tmp", delete=False)
+
+    def add(self, url: str, temp_path: str, ext: str, etag: str | None, last_modified: str | None) -> str:
+        """Moves a downloaded cover into the cache and returns its path."""
+        digest = hash_file(temp_path)
+        size = os.path.getsize(temp_path)
+        path = self._image_path(digest, ext)
+        with self._lock:
+            conn = self._connection()
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(temp_path, path)
+            now = time.time()
+            old_row = conn.execute("SELECT digest, ext FROM covers WHERE url = ?", (url,)).fetchone()
+            conn.execute(
+                "INSERT OR REPLACE INTO covers (url, digest, ext, size, etag, last_modified, checked_at, accessed_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (url, digest, ext, size, etag, last_modified, now, now),
+            )
+            conn.commit()
+            if old_row is not None and old_row[0] != digest:
+                self._remove_unused_image(*old_row)
+            self._evict(keep=digest)
+        return path
+
+    def mark_checked(self, url: str) -> None:
+        """Records that the cover at `url` was checked and hasn't changed."""
+        with self._lock:
+            conn = self._connection()
+            conn.execute("UPDATE covers SET checked_at = ? WHERE url = ?", (time.time(), url))
+            conn.commit()
+
+    def hold(self, url: str) -> None:
+        """Keeps the cover at `url` from being evicted until it's released, once for every time it was held."""
+        with self._lock:
+            self._held[url] += 1
+
+    def release(self, url: str) -> None:
+        with self._lock:
+            self._held[url] -= 1
+            if self._held[url] <= 0:
+                del self._held[url]
+
+    def _evict(self, keep: str | None = None) -> None:
+        """Removes the least recently used images until they fit in `max_size`, apart from `keep` and held covers."""
+        if not self.max_size:
+            return
+        conn = self._connection()
+        # images shared by several urls are only counted once
+        (total,) = conn.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM (SELECT DISTINCT digest, size FROM covers)"
+        ).fetchone()
+        if total <= self.max_size:
+            return
+        rows = conn.execute("SELECT url, digest, ext, size FROM covers ORDER BY accessed_at").fetchall()
+        # these may leave the cache over `max_size` until they're no longer needed
+        kept = {digest for url, digest, _, _ in rows if url in self._held}
+        kept.add(keep)
+        for url, digest, ext, size in rows:
+            if digest in kept:
+                continue
+            conn.execute("DELETE FROM covers WHERE url = ?", (url,))
+            if self._remove_unused_image(digest, ext):
+                total -= size
+            if total <= self.max_size:
+                break
+        conn.commit()
+
+    def _remove_unused_image(self, digest: str, ext: str) -> bool:
+        """Removes an image if no url refers to it anymore, returning whether it was removed."""
+        if self._connection().execute("SELECT 1 FROM covers WHERE digest = ?", (digest,)).fetchone():
+            return False
+        with suppress(FileNotFoundError):
+            os.remove(self._image_path(digest, ext))
+        return True
+
+    def _remove_stale_temp_files(self) -> None:
+        now = time.time()
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(".tmp") and now - entry.stat().st_mtime > self.STALE_TEMP_FILE_AGE:
+                with suppress(OSError):
+                    os.remove(entry.path)
+
+    def stats(self) -> dict:
+        with self._lock:
+            conn = self._connection()
+            (urls,) = conn.execute("SELECT COUNT(*) FROM covers").fetchone()
+            images, size = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM (SELECT DISTINCT digest, size FROM covers)"
+            ).fetchone()
+        return {"path": self.directory, "urls": urls, "images": images, "size_bytes": size}
+
+    def clear(self) -> int:
+        """Removes every cover from the cache and returns the number of removed images."""
+        with self._lock:
+            conn = self._connection()
+            rows = conn.execute("SELECT DISTINCT digest, ext FROM covers").fetchall()
+            conn.execute("DELETE FROM covers")
+            conn.commit()
+            for digest, ext in rows:
+                with suppress(FileNotFoundError):
+                    os.remove(self._image_path(digest, ext))
+            return len(rows)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+def hash_file(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(64 * 1024):
+            digest.update(chunk)
+    return digest.hexdigest()
@@ -0,0 +1,218 @@
+import gzip
+import io
+import threading
+import zlib
+from typing import TYPE_CHECKING, BinaryIO
+from urllib import parse
+from urllib.error import HTTPError
+
+# http.client (along with ssl and email) is only imported once the first request is made,
+# so that beets commands which don't use the plugin aren't slowed down by loading it
+if TYPE_CHECKING:
+    import http.client
+
+MAX_REDIRECTS = 5
+REDIRECT_CODES = (301, 302, 303, 307, 308)
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+
+
+class Response:
+    url: str
+    status: int
+    reason: str
+    headers: "http.client.HTTPMessage"
+    body: bytes
+
+    def __init__(self, url, status, reason, headers, body):
+        self.url = url
+        self.status = status
+        self.reason = reason
+        self.headers = headers
+        self.body = body
+
+
+class HTTPClient:
+    """
+    HTTP client which keeps a pool of open connections to each host, so that
+    consecutive requests to the same host don't need a new TCP connection and TLS handshake.
+
+    Responses are requested gzip compressed, and failed requests raise `urllib.error.HTTPError`
+    just like `urllib.request.urlopen` does.
+    """
+
+    def __init__(
+        self,
+        connect_timeout: float = 10,
+        read_timeout: float = 30,
+        max_connections_per_host: int = 10,
+        headers: dict[str, str] | None = None,
+        base_url: str | None = None,
+    ):
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.max_connections_per_host = max_connections_per_host
+        self.headers = headers or {}
+        # When set, requests are sent to this server instead, see `rewrite_url`
+        self.base_url = base_url
+        # idle connections, keyed by (scheme, host, port)
+        self._pools: dict[tuple[str, str, int], list[http.client.HTTPConnection]] = {}
+        self._lock = threading.Lock()
+        # totals since the client was created, including redirects and failed requests
+        self.request_count = 0
+        self.bytes_received = 0
+
+    def request(self, url: str, headers: dict[str, str] | None = None) -> Response:
+        """Makes a GET request, following redirects, and returns the decoded response."""
+        return self._request(url, headers, None)
+
+    def download(self, url: str, file: BinaryIO, headers: dict[str, str] | None = None) -> Response:
+        """
+        Like `request`, but a successful response's body is written to `file` in chunks as it's received,
+        instead of being kept in memory. The body of the returned response is empty.
+        """
+        # the body is written as is, so it mustn't be compressed
+        return self._request(url, {**(headers or {}), "Accept-Encoding": "identity"}, file)
+
+    def _request(self, url: str, headers: dict[str, str] | None, file: BinaryIO | None) -> Response:
+        url = rewrite_url(url, self.base_url)
+        for _ in range(MAX_REDIRECTS + 1):
+            response = self._request_once(url, headers, file)
+            location = response.headers.get("Location")
+            if response.status not in REDIRECT_CODES or not location:
+                break
+            url = parse.urljoin(url, location)
+
+        if response.status >= 400:
+            raise HTTPError(url, response.status, response.reason, response.headers, io.BytesIO(response.body))
+        return response
+
+    def count_transfer(self, num_bytes: int) -> None:
+        with self._lock:
+            self.request_count += 1
+            self.bytes_received += num_bytes
+
+    def close(self) -> None:
+        with self._lock:
+            pools = list(self._pools.values())
+            self._pools.clear()
+        for pool in pools:
+            for conn in pool:
+                conn.close()
+
+    def _request_once(self, url: str, headers: dict[str, str] | None, file: BinaryIO | None = None) -> Response:
+        import http.client
+
+        parts = parse.urlsplit(url)
+        scheme = parts.scheme.lower()
+        port = parts.port or (443 if scheme == "https" else 80)
+        key = (scheme, parts.hostname, port)
+        proxy = self._get_proxy(scheme, parts.netloc)
+        path = parts.path or "/"
+        if parts.query:
+            path = f"{path}?{parts.query}"
+        if proxy and scheme == "http":
+            # plain http proxies expect the full url in the request line
+            path = url
+
+        request_headers = {"Accept-Encoding": "gzip, deflate", **self.headers, **(headers or {})}
+        # A connection from the pool may have been closed by the server while idle.
+        # In that case, retry once with a new connection.
+        for attempt in range(2):
+            conn = self._get_connection(key, proxy)
+            is_reused = conn.sock is not None
+            try:
+                conn.request("GET", path, headers=request_headers)
+                conn.sock.settimeout(self.read_timeout)
+                resp = conn.getresponse()
+                if file is not None and resp.status == 200:
+                    file.seek(0)
+                    file.truncate()
+                    num_bytes = copy_body(resp, file)
+                    body = b""
+                else:
+                    body = resp.read()
+                    num_bytes = len(body)
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                conn.close()
+                if is_reused and attempt == 0:
+                    continue
+                raise
+            except BaseException:
+                conn.close()
+                raise
+            break
+
+        if resp.will_close:
+            conn.close()
+        else:
+            self._release_connection(key, conn)
+        self.count_transfer(num_bytes)
+        body = decode_body(body, resp.headers.get("Content-Encoding"))
+        return Response(url, resp.status, resp.reason, resp.headers, body)
+
+    def _get_connection(self, key: tuple[str, str, int], proxy: str | None) -> "http.client.HTTPConnection":
+        import http.client
+
+        with self._lock:
+            pool = self._pools.get(key)
+            if pool:
+                return pool.pop()
+
+        scheme, host, port = key
+        connection_class = http.client.HTTPSConnection if scheme == "https" else http.client.HTTPConnection
+        if not proxy:
+            return connection_class(host, port, timeout=self.connect_timeout)
+
+        proxy_parts = parse.urlsplit(proxy)
+        proxy_port = proxy_parts.port or (443 if proxy_parts.scheme == "https" else 80)
+        conn = connection_class(proxy_parts.hostname, proxy_port, timeout=self.connect_timeout)
+        if scheme == "https":
+            conn.set_tunnel(host, port)
+        return conn
+
+    def _release_connection(self, key: tuple[str, str, int], conn: "http.client.HTTPConnection") -> None:
+        with self._lock:
+            pool = self._pools.setdefault(key, [])
+            if len(pool) < self.max_connections_per_host:
+                pool.append(conn)
+                return
+        conn.close()
+
+    @staticmethod
+    def _get_proxy(scheme: str, netloc: str) -> str | None:
+        """Returns the proxy configured in the environment for a url, like urllib does."""
+        from urllib import request
+
+        proxies = request.getproxies()
+        if scheme not in proxies or request.proxy_bypass(netloc):
+            return None
+        return proxies[scheme]
+
+
+def rewrite_url(url: str, base_url: str | None) -> str:
+    """
+    Points a url at `base_url` instead, keeping the original host as the first path segment,
+    e.g `https://api.audnex.us/books/B0036UC2LO` becomes `http://localhost:8000/api.audnex.us/books/B0036UC2LO`
+    """
+    if not base_url:
+        return url
+    parts = parse.urlsplit(url)
+    rewritten = f"{base_url.rstrip('/')}/{parts.netloc}{parts.path}"
+    return f"{rewritten}?{parts.query}" if parts.query else rewritten
+
+
+def copy_body(resp: "http.client.HTTPResponse", file: BinaryIO) -> int:
+    """Writes a response's body to `file` in chunks, returning the number of bytes written."""
+    num_bytes = 0
+    while chunk := resp.read(DOWNLOAD_CHUNK_SIZE):
+        file.write(chunk)
+        num_bytes += len(chunk)
+    return num_bytes
+
+
+def decode_body(body: bytes, content_encoding: str | None) -> bytes:
+    if content_encoding == "gzip":
+        return gzip.decompress(body)
+    if content_encoding == "deflate":
+        return zlib.decompress(body)
+    return body
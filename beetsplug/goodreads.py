@@ -3,15 +3,15 @@ from xml.etree.ElementTree import Element
 from .api import search_goodreads
 
 
-def get_original_date(self, asin: str, authors: str, title: str) -> dict:
+def get_original_date(self, asin: str, authors: str, title: str, use_cache: bool = True) -> dict:
     api_key = self.config["goodreads_apikey"]
-    goodreads_response = search_goodreads(api_key, asin)
+    goodreads_response = search_goodreads(api_key, asin, use_cache)
     totalresults = goodreads_get_total_result(goodreads_response)
 
     if totalresults == 0:
         # search with author and title
         self._log.debug("search Goodreads again based on author/title.")
-        goodreads_response = search_goodreads(api_key, f"{authors} {title}")
+        goodreads_response = search_goodreads(api_key, f"{authors} {title}", use_cache)
         totalresults = goodreads_get_total_result(goodreads_response)
 
     self._log.debug(f"{totalresults} results found")
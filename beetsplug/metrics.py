@@ -0,0 +1,145 @@
+import bisect
+import json
+import os
+import threading
+from contextlib import suppress
+
+# Upper bounds of the latency histogram buckets, in milliseconds. The last bucket holds everything slower.
+LATENCY_BUCKETS_MS = (50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+REQUEST_COUNTERS = ("requests", "errors", "retries", "rate_limited", "bytes", "wait_seconds")
+CACHE_COUNTERS = ("hits", "misses")
+
+
+class Histogram:
+    """Latency histogram with fixed buckets, so that histograms from different sessions can be added up."""
+
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    @property
+    def count(self) -> int:
+        return sum(self.counts)
+
+    def observe(self, ms: float) -> None:
+        self.counts[bisect.bisect_left(LATENCY_BUCKETS_MS, ms)] += 1
+        self.total_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+
+    def percentile(self, p: float) -> float:
+        """Returns the upper bound of the bucket containing the `p`th percentile, capped at the maximum."""
+        rank = p / 100 * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if n and seen >= rank:
+                return min(LATENCY_BUCKETS_MS[i], self.max_ms) if i < len(LATENCY_BUCKETS_MS) else self.max_ms
+        return 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            "buckets_ms": list(LATENCY_BUCKETS_MS),
+            "counts": self.counts,
+            "total_ms": self.total_ms,
+            "max_ms": self.max_ms,
+        }
+
+    def merge(self, data: dict) -> None:
+        if data.get("buckets_ms") != list(LATENCY_BUCKETS_MS):
+            # recorded with different buckets, only the totals are still meaningful
+            self.total_ms += data.get("total_ms", 0)
+            self.max_ms = max(self.max_ms, data.get("max_ms", 0))
+            return
+        self.counts = [a + b for a, b in zip(self.counts, data["counts"], strict=True)]
+        self.total_ms += data["total_ms"]
+        self.max_ms = max(self.max_ms, data["max_ms"])
+
+
+class Metrics:
+    """
+    Counters and latency histograms of the requests made by the plugin, keyed by endpoint and region,
+    e.g ("audnex_book", "us"), and hit/miss counters of its caches.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        self.requests: dict[tuple[str, str], dict[str, float]] = {}
+        self.latencies: dict[tuple[str, str], Histogram] = {}
+        self.caches: dict[str, dict[str, int]] = {}
+
+    def is_empty(self) -> bool:
+        return not self.requests and not self.caches
+
+    def _counters(self, endpoint: str, region: str) -> dict[str, float]:
+        key = (endpoint, region)
+        if key not in self.requests:
+            self.requests[key] = dict.fromkeys(REQUEST_COUNTERS, 0)
+            self.latencies[key] = Histogram()
+        return self.requests[key]
+
+    def record_request(self, endpoint: str, region: str, seconds: float, num_bytes: int = 0, error: bool = False):
+        with self._lock:
+            counters = self._counters(endpoint, region)
+            counters["requests"] += 1
+            counters["bytes"] += num_bytes
+            if error:
+                counters["errors"] += 1
+            self.latencies[(endpoint, region)].observe(seconds * 1000)
+
+    def increment(self, endpoint: str, region: str, name: str, amount: float = 1) -> None:
+        with self._lock:
+            self._counters(endpoint, region)[name] += amount
+
+    def record_cache(self, cache: str, hit: bool) -> None:
+        with self._lock:
+            counters = self.caches.setdefault(cache, dict.fromkeys(CACHE_COUNTERS, 0))
+            counters["hits" if hit else "misses"] += 1
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            return {
+                "requests": [
+                    {
+                        "endpoint": endpoint,
+                        "region": region,
+                        **counters,
+                        "latency": self.latencies[(endpoint, region)].to_dict(),
+                    }
+                    for (endpoint, region), counters in sorted(self.requests.items())
+                ],
+                "caches": {cache: dict(counters) for cache, counters in sorted(self.caches.items())},
+            }
+
+    def merge(self, data: dict) -> None:
+        """Adds metrics previously returned by `to_dict` to these ones."""
+        with self._lock:
+            for entry in data.get("requests", []):
+                counters = self._counters(entry["endpoint"], entry["region"])
+                for name in REQUEST_COUNTERS:
+                    counters[name] += entry.get(name, 0)
+                self.latencies[(entry["endpoint"], entry["region"])].merge(entry.get("latency", {}))
+            for cache, entry in data.get("caches", {}).items():
+                counters = self.caches.setdefault(cache, dict.fromkeys(CACHE_COUNTERS, 0))
+                for name in CACHE_COUNTERS:
+                    counters[name] += entry.get(name, 0)
+
+
+def load_metrics(path: str) -> Metrics:
+    """Loads metrics saved with `save_metrics`, returning empty metrics if there are none or the file is unreadable."""
+    metrics = Metrics()
+    with suppress(OSError, ValueError, KeyError, TypeError), open(path) as f:
+        metrics.merge(json.load(f))
+    return metrics
+
+
+def save_metrics(metrics: Metrics, path: str) -> None:
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    # write to a temporary file first, so that an interrupted write doesn't lose the previous totals
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(metrics.to_dict(), f, indent=2)
+    os.replace(tmp_path, path)
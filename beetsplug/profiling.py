@@ -0,0 +1,107 @@
+import hashlib
+import io
+import os
+import re
+import threading
+from contextlib import contextmanager
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import cProfile
+
+
+class Profiler:
+    """
+    Profiles the plugin's entry points with cProfile, keeping a separate profile per import task.
+
+    Each thread has its own profile of each task, so profiled calls from different threads (e.g beets'
+    import pipeline stages) don't wait for each other, and the profiles are merged when they're written.
+    Since Python 3.12 only one profile can be enabled at a time, and it records the calls of every thread,
+    so a call made while another thread is profiling is recorded in that thread's profile instead, while it's enabled.
+    Nested profiled calls are recorded in the outer call's profile.
+    """
+
+    def __init__(self):
+        self.directory: str | None = None
+        # the profiles of each import task, one for each thread which worked on it
+        self._profiles: dict[str, list[cProfile.Profile]] = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    @property
+    def enabled(self) -> bool:
+        return self.directory is not None
+
+    def enable(self, directory: str) -> None:
+        self.directory = directory
+
+    @contextmanager
+    def profile(self, key: str):
+        """Profiles the block, adding to the profile of the import task `key`, e.g a book's ASIN or folder."""
+        if not self.enabled or getattr(self._local, "is_active", False):
+            yield
+            return
+        import cProfile
+
+        profiles = self._local.__dict__.setdefault("profiles", {})
+        profile = profiles.get(key) or cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # another thread's profile is enabled, see the class docstring
+            yield
+            return
+        if key not in profiles:
+            profiles[key] = profile
+            with self._lock:
+                self._profiles.setdefault(key, []).append(profile)
+        self._local.is_active = True
+        try:
+            yield
+        finally:
+            profile.disable()
+            self._local.is_active = False
+
+    def write(self, summary_limit: int = 50) -> list[str]:
+        """
+        Writes a `.prof` file per import task, plus the combined profile of all tasks as `combined.prof`
+        and its `summary_limit` most expensive functions as `summary.txt`. Returns the written paths.
+        """
+        with self._lock:
+            profiles = {key: list(thread_profiles) for key, thread_profiles in self._profiles.items()}
+        if not self.enabled or not profiles:
+            return []
+        import pstats
+
+        os.makedirs(self.directory, exist_ok=True)
+        paths = []
+        for key, thread_profiles in profiles.items():
+            path = os.path.join(self.directory, get_profile_filename(key))
+            pstats.Stats(*thread_profiles).dump_stats(path)
+            paths.append(path)
+
+        combined = pstats.Stats(*(profile for thread_profiles in profiles.values() for profile in thread_profiles))
+        combined_path = os.path.join(self.directory, "combined.prof")
+        combined.dump_stats(combined_path)
+        paths.append(combined_path)
+
+        summary = io.StringIO()
+        summary.write(f"Profiled {len(profiles)} import tasks: {', '.join(profiles)}\n\n")
+        combined.stream = summary
+        combined.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(summary_limit)
+        summary_path = os.path.join(self.directory, "summary.txt")
+        with open(summary_path, "w") as f:
+            f.write(summary.getvalue())
+        paths.append(summary_path)
+        return paths
+
+
+def get_profile_filename(key: str) -> str:
+    """Returns a file name for the profile of `key`, e.g `The Way of Kings-1a2b3c4d.prof` for a folder."""
+    name = re.sub(r"[^\w.-]+", "_", os.path.basename(key.rstrip("/\\")) or key).strip("_")[:60]
+    digest = hashlib.sha1(key.encode()).hexdigest()[:8]
+    return f"{name}-{digest}.prof"
+
+
+# Shared by the whole plugin, enabled when the `profile_dir` option is set
+profiler = Profiler()
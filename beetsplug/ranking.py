@@ -0,0 +1,75 @@
+import re
+from difflib import SequenceMatcher
+from functools import lru_cache
+
+PUNCTUATION = r"[^\w\s\d]"
+ABRIDGED_INDICATOR = r"(?i)\((unabridged|abridged)\)"
+
+
+# the files' album and artist are normalized again for every search result and candidate they're compared with
+@lru_cache(maxsize=1024)
+def normalize(text: str) -> str:
+    """
+    Normalizes titles and names for comparison by removing punctuation and "(unabridged)",
+    converting to lowercase, as well as changing multiple consecutive spaces to a single space
+    """
+    text = re.sub(ABRIDGED_INDICATOR, "", text.strip().lower())
+    text = re.sub(PUNCTUATION, "", text)
+    return " ".join(text.split())
+
+
+def similarity(a: str, b: str) -> float:
+    """Returns how similar two normalized strings are, from 0 to 1."""
+    if not a or not b:
+        return 0.0
+    # account for different length strings, e.g a title with or without its subtitle
+    if a in b or b in a:
+        return 1.0
+    return SequenceMatcher(None, a, b).ratio()
+
+
+class PreRanker:
+    """
+    Scores Audible search results against the files being imported, before their details are fetched.
+
+    Scores range from 0 to 1 and combine how well the title, author and runtime match.
+    A different ranking can be used by assigning a subclass overriding `score` to `Audible.preranker`.
+    """
+
+    def __init__(self, title_weight: float = 0.5, author_weight: float = 0.3, runtime_weight: float = 0.2):
+        self.title_weight = title_weight
+        self.author_weight = author_weight
+        self.runtime_weight = runtime_weight
+
+    def score(self, product: dict, album: str, artist: str | None, runtime_sec: float | None) -> float:
+        """
+        Scores a search result. Parts that can't be compared, e.g the runtime when the files have no length,
+        are left out rather than counted as a mismatch.
+        """
+        parts = [(self.title_weight, self.title_score(product, album))]
+        if artist:
+            parts.append((self.author_weight, self.author_score(product, artist)))
+        product_runtime_min = product.get("runtime_length_min")
+        if runtime_sec and product_runtime_min:
+            parts.append((self.runtime_weight, self.runtime_score(product_runtime_min * 60, runtime_sec)))
+        total_weight = sum(weight for weight, _ in parts)
+        if not total_weight:
+            return 0.0
+        return sum(weight * score for weight, score in parts) / total_weight
+
+    @staticmethod
+    def title_score(product: dict, album: str) -> float:
+        return similarity(normalize(album or ""), normalize(product.get("title") or ""))
+
+    @staticmethod
+    def author_score(product: dict, artist: str) -> float:
+        normalized_artist = normalize(artist)
+        return max(
+            (similarity(normalized_artist, normalize(a.get("name") or "")) for a in product.get("authors") or []),
+            default=0.0,
+        )
+
+    @staticmethod
+    def runtime_score(product_runtime_sec: float, runtime_sec: float) -> float:
+        """Returns the ratio of the shorter runtime to the longer one."""
+        return min(product_runtime_sec, runtime_sec) / max(product_runtime_sec, runtime_sec)
@@ -0,0 +1,107 @@
+import random
+import threading
+import time
+
+
+class TokenBucket:
+    """
+    Allows `rate` requests per second on average, with bursts of up to `capacity` requests.
+
+    Tokens are reserved rather than waited for, so the bucket can go into debt. The caller is
+    told how long to wait for its token, which keeps concurrent callers evenly spaced.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+
+    def reserve(self, now: float) -> float:
+        """Takes a token and returns the number of seconds to wait before using it."""
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+        self.tokens -= 1
+        if self.tokens >= 0:
+            return 0.0
+        return -self.tokens / self.rate
+
+
+class RateLimiter:
+    """
+    Rate limiter shared by every request made by the plugin, with a token bucket per host.
+
+    When a host responds with a 429, `block` pauses all requests to it, not only the one that
+    was rate limited, so that concurrent lookups don't keep hitting the limit. With `requests_per_second`
+    set to 0, that's the only time requests are held back.
+    """
+
+    def __init__(
+        self,
+        requests_per_second: float = 0,
+        burst: int = 10,
+        max_retries: int = 3,
+        backoff_base: float = 2,
+        backoff_max: float = 60,
+    ):
+        self.requests_per_second = requests_per_second
+        self.burst = burst
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._buckets: dict[str, TokenBucket] = {}
+        self._blocked_until: dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def configure(self, requests_per_second: float, burst: int, max_retries: int) -> None:
+        with self._lock:
+            self.requests_per_second = requests_per_second
+            self.burst = burst
+            self.max_retries = max_retries
+            self._buckets.clear()
+
+    def reserve(self, host: str) -> float:
+        """Reserves a request to `host` and returns the number of seconds to wait before making it."""
+        with self._lock:
+            now = time.monotonic()
+            wait = max(0.0, self._blocked_until.get(host, 0.0) - now)
+            if self.requests_per_second <= 0:
+                # rate limiting is disabled
+                return wait
+            bucket = self._buckets.get(host)
+            if bucket is None:
+                bucket = self._buckets[host] = TokenBucket(self.requests_per_second, max(1, self.burst))
+            return max(wait, bucket.reserve(now))
+
+    def acquire(self, host: str) -> None:
+        """Blocks until a request to `host` can be made."""
+        wait = self.reserve(host)
+        if wait > 0:
+            time.sleep(wait)
+
+    def block(self, host: str, seconds: float) -> None:
+        """Pauses every request to `host` for the given number of seconds."""
+        with self._lock:
+            until = time.monotonic() + seconds
+            self._blocked_until[host] = max(until, self._blocked_until.get(host, 0.0))
+
+    def backoff(self, attempt: int) -> float:
+        """Returns a jittered, exponentially increasing delay before retrying a failed request."""
+        delay = min(self.backoff_max, self.backoff_base * 2**attempt)
+        return delay / 2 + random.uniform(0, delay / 2)
+
+
+def parse_retry_after(value: str | None) -> float | None:
+    """Parses a Retry-After header, which is either a number of seconds or a HTTP date."""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    from email.utils import parsedate_to_datetime
+
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, retry_at.timestamp() - time.time())
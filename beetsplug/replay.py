@@ -0,0 +1,118 @@
+import base64
+import email.message
+import hashlib
+import io
+import json
+import os
+import re
+from typing import BinaryIO
+from urllib import parse
+from urllib.error import HTTPError
+
+from .client import HTTPClient, Response
+
+# Query parameters which are left out of fixtures, so that recordings don't contain secrets
+# and don't depend on whose API key was used
+IGNORED_QUERY_PARAMS = ("key",)
+
+
+class FixtureNotFoundError(HTTPError):
+    """Raised when replaying a request which has no recorded fixture."""
+
+    def __init__(self, url: str, path: str):
+        super().__init__(url, 404, f"no fixture recorded at {path}", email.message.Message(), io.BytesIO())
+
+
+def canonical_url(url: str) -> str:
+    parts = parse.urlsplit(url)
+    query = [(k, v) for k, v in parse.parse_qsl(parts.query, keep_blank_values=True) if k not in IGNORED_QUERY_PARAMS]
+    return parse.urlunsplit((parts.scheme, parts.netloc, parts.path, parse.urlencode(sorted(query)), ""))
+
+
+def fixture_path(fixtures_dir: str, url: str) -> str:
+    """Returns where the fixture for a url is stored, e.g `api.audnex.us/books-B0036UC2LO-3f2a....json`"""
+    url = canonical_url(url)
+    parts = parse.urlsplit(url)
+    readable_path = re.sub(r"[^\w.-]+", "-", parts.path).strip("-")[:60]
+    digest = hashlib.sha1(url.encode()).hexdigest()[:12]
+    return os.path.join(fixtures_dir, parts.hostname or "unknown", f"{readable_path}-{digest}.json")
+
+
+def save_fixture(fixtures_dir: str, url: str, status: int, reason: str, headers, body: bytes) -> str:
+    path = fixture_path(fixtures_dir, url)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fixture = {
+        "url": canonical_url(url),
+        "status": status,
+        "reason": reason,
+        # the body is stored decoded, so the original encoding no longer applies
+        "headers": [
+            [k, v] for k, v in headers.items() if k.lower() not in ("content-encoding", "content-length", "connection")
+        ],
+        "body": base64.b64encode(body).decode("ascii"),
+    }
+    with open(path, "w") as f:
+        json.dump(fixture, f, indent=2)
+    return path
+
+
+def load_fixture(fixtures_dir: str, url: str) -> Response | None:
+    path = fixture_path(fixtures_dir, url)
+    if not os.path.isfile(path):
+        return None
+    with open(path) as f:
+        fixture = json.load(f)
+    headers = email.message.Message()
+    for k, v in fixture["headers"]:
+        headers[k] = v
+    return Response(url, fixture["status"], fixture["reason"], headers, base64.b64decode(fixture["body"]))
+
+
+class RecordingClient(HTTPClient):
+    """HTTP client which saves every response it receives, including errors, as a fixture."""
+
+    def __init__(self, fixtures_dir: str, **kwargs):
+        super().__init__(**kwargs)
+        self.fixtures_dir = fixtures_dir
+
+    def request(self, url: str, headers: dict[str, str] | None = None) -> Response:
+        try:
+            response = super().request(url, headers)
+        except HTTPError as e:
+            save_fixture(self.fixtures_dir, url, e.code, e.reason, e.headers, e.read())
+            raise
+        save_fixture(self.fixtures_dir, url, response.status, response.reason, response.headers, response.body)
+        return response
+
+    def download(self, url: str, file: BinaryIO, headers: dict[str, str] | None = None) -> Response:
+        # the body is needed for the fixture, so it isn't streamed
+        return write_response_body(self.request(url, headers), file)
+
+
+class ReplayClient(HTTPClient):
+    """HTTP client which returns recorded fixtures instead of making requests."""
+
+    def __init__(self, fixtures_dir: str, **kwargs):
+        super().__init__(**kwargs)
+        self.fixtures_dir = fixtures_dir
+
+    def request(self, url: str, headers: dict[str, str] | None = None) -> Response:
+        response = load_fixture(self.fixtures_dir, url)
+        self.count_transfer(len(response.body) if response else 0)
+        if response is None:
+            raise FixtureNotFoundError(url, fixture_path(self.fixtures_dir, url))
+        if response.status >= 400:
+            raise HTTPError(url, response.status, response.reason, response.headers, io.BytesIO(response.body))
+        return response
+
+    def download(self, url: str, file: BinaryIO, headers: dict[str, str] | None = None) -> Response:
+        return write_response_body(self.request(url, headers), file)
+
+
+def write_response_body(response: Response, file: BinaryIO) -> Response:
+    """Writes a response's body to `file` and returns the response without it, like `HTTPClient.download`."""
+    if response.status == 200:
+        file.seek(0)
+        file.truncate()
+        file.write(response.body)
+    return Response(response.url, response.status, response.reason, response.headers, b"")
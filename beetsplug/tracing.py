@@ -0,0 +1,98 @@
+import contextvars
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# Import task which spans recorded in the current context belong to, 0 if there's none.
+# Each task gets its own process in the trace, so that its spans are grouped together.
+_current_task: contextvars.ContextVar[int] = contextvars.ContextVar("audible_trace_task", default=0)
+
+
+def _now_us() -> int:
+    return time.perf_counter_ns() // 1000
+
+
+class Tracer:
+    """
+    Records spans in the Chrome trace event format, which can be opened with https://ui.perfetto.dev
+    or chrome://tracing.
+
+    Spans are only recorded once the tracer is enabled. Spans made while handling an import task are
+    grouped by task, and spans made in other threads appear as separate tracks, so that requests which
+    overlap are visible. Threads started while handling a task need to run in a copy of the caller's
+    context (see `contextvars.copy_context`) to be grouped with it.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self._events: list[dict] = []
+        self._tasks: dict[str, int] = {}
+        self._threads: dict[tuple[int, int], str] = {}
+        self._lock = threading.Lock()
+
+    def enable(self) -> None:
+        self.enabled = True
+
+    def clear(self) -> None:
+        with self._lock:
+            self._events.clear()
+            self._tasks.clear()
+            self._threads.clear()
+
+    @contextmanager
+    def task(self, key: str):
+        """Groups the spans recorded in this context under the import task `key`, e.g the book's folder."""
+        if not self.enabled:
+            yield
+            return
+        with self._lock:
+            pid = self._tasks.setdefault(key, len(self._tasks) + 1)
+        token = _current_task.set(pid)
+        try:
+            yield
+        finally:
+            _current_task.reset(token)
+
+    @contextmanager
+    def span(self, name: str, **args):
+        """Records the time spent in the block as a span of the current thread."""
+        if not self.enabled:
+            yield
+            return
+        start = _now_us()
+        try:
+            yield
+        finally:
+            self._add({"name": name, "ph": "X", "ts": start, "dur": _now_us() - start, "args": args})
+
+    def _add(self, event: dict) -> None:
+        thread = threading.current_thread()
+        event["pid"] = _current_task.get()
+        event["tid"] = thread.ident
+        with self._lock:
+            self._events.append(event)
+            self._threads.setdefault((event["pid"], event["tid"]), thread.name)
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            metadata = [{"name": "process_name", "ph": "M", "pid": 0, "args": {"name": "audible"}}]
+            metadata += [
+                {"name": "process_name", "ph": "M", "pid": pid, "args": {"name": key}}
+                for key, pid in self._tasks.items()
+            ]
+            metadata += [
+                {"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": name}}
+                for (pid, tid), name in self._threads.items()
+            ]
+            return {"traceEvents": metadata + self._events, "displayTimeUnit": "ms"}
+
+    def write(self, path: str) -> None:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(self.to_dict(), f)
+
+
+# Shared by the whole plugin, enabled when the `trace_file` option is set
+tracer = Tracer()
@@ -0,0 +1,279 @@
+"""
+Benchmarks the candidate lookup and match pipeline of the plugin against recorded or synthetic fixtures.
+
+Each stage is run several times. The median wall time, and the HTTP requests, bytes transferred and
+peak memory of the first run are reported. Results can be saved as a baseline and compared against later.
+
+    uv run python scripts/benchmark.py --synthetic --files 300 --save-baseline benchmark-baseline.json
+    uv run python scripts/benchmark.py --synthetic --files 300 --compare benchmark-baseline.json
+
+To benchmark against real responses, record fixtures (see development.md) and pass them with `--fixtures`,
+along with the album, artist and ASIN that were looked up while recording.
+"""
+
+import argparse
+import copy
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+SYNTHETIC_ALBUM = "The Way of Kings"
+SYNTHETIC_ARTIST = "Brandon Sanderson"
+
+
+def write_synthetic_fixtures(fixtures_dir: str, products: int, chapters: int, album: str, artist: str) -> str:
+    """Writes fixtures for a search returning `products` books of `chapters` chapters each, returns the first ASIN."""
+    from beetsplug import api
+    from beetsplug.replay import save_fixture
+
+    headers = {"Content-Type": "application/json"}
+    summary = "<p>" + "A long and <b>detailed</b> summary of the book. " * 40 + "</p>"
+    search_products = []
+    for n in range(products):
+        asin = f"B0SYNTH{n:03d}"
+        title = album if n == 0 else f"{album} Companion {n}"
+        search_products.append(
+            {
+                "asin": asin,
+                "title": title,
+                "authors": [{"asin": "A1", "name": artist}],
+                "narrators": [{"name": "Michael Kramer"}, {"name": "Kate Reading"}],
+                "release_date": "2010-08-31",
+                "runtime_length_min": chapters * 30,
+                "language": "english",
+                "publisher_name": "Macmillan Audio",
+                "publisher_summary": summary,
+                "series": [{"asin": "S1", "title": "The Stormlight Archive", "sequence": "1"}],
+            }
+        )
+        book = {
+            "asin": asin,
+            "authors": [{"asin": "A1", "name": artist}],
+            "description": "A book.",
+            "formatType": "unabridged",
+            "genres": [
+                {"asin": "G1", "name": "Fantasy", "type": "genre"},
+                {"asin": "T1", "name": "Epic", "type": "tag"},
+            ],
+            "image": f"https://m.media-amazon.com/images/I/{asin}.jpg",
+            "language": "english",
+            "narrators": [{"name": "Michael Kramer"}, {"name": "Kate Reading"}],
+            "publisherName": "Macmillan Audio",
+            "releaseDate": "2010-08-31T00:00:00.000Z",
+            "runtimeLengthMin": chapters * 30,
+            "seriesPrimary": {"asin": "S1", "name": "The Stormlight Archive", "position": "1"},
+            "summary": summary,
+            "title": title,
+            "region": "us",
+        }
+        chapter_length_ms = 30 * 60 * 1000
+        chapter_info = {
+            "asin": asin,
+            "brandIntroDurationMs": 2000,
+            "brandOutroDurationMs": 5000,
+            "chapters": [
+                {
+                    "lengthMs": chapter_length_ms,
+                    "startOffsetMs": i * chapter_length_ms,
+                    "startOffsetSec": i * chapter_length_ms // 1000,
+                    "title": f"Chapter {i + 1}",
+                }
+                for i in range(chapters)
+            ],
+            "isAccurate": True,
+            "runtimeLengthMs": chapters * chapter_length_ms,
+            "runtimeLengthSec": chapters * chapter_length_ms // 1000,
+        }
+        for endpoint, data in (("book", book), ("chapters", chapter_info)):
+            body = json.dumps(data).encode()
+            save_fixture(fixtures_dir, api.get_audnex_url(asin, "us", endpoint), 200, "OK", headers, body)
+
+    body = json.dumps({"products": search_products}).encode()
+    query = f"{album} {artist}"
+    save_fixture(fixtures_dir, api.get_audible_search_url(query, "us"), 200, "OK", headers, body)
+    return search_products[0]["asin"]
+
+
+def create_items(files: int, runtime_sec: float, album: str, artist: str) -> list:
+    from beets.library import Item
+
+    return [
+        Item(
+            path=f"/audiobooks/{album}/{album} - Part {i + 1}.mp3".encode(),
+            title=f"{album} - Part {i + 1}",
+            album=album,
+            artist=artist,
+            length=runtime_sec / files,
+            track=i + 1,
+        )
+        for i in range(files)
+    ]
+
+
+def create_plugin(fixtures_dir: str):
+    import beets
+
+    os.environ["BEETSDIR"] = tempfile.mkdtemp(prefix="beets-audible-benchmark-")
+    beets.config.read(user=False, defaults=True)
+    beets.config["audible"].set(
+        {
+            "replay_mode": "replay",
+            "replay_dir": fixtures_dir,
+            "cache": False,
+            "fetch_art": False,
+            "rate_limit": 0,
+        }
+    )
+    from beetsplug.audible import Audible
+
+    return Audible()
+
+
+def measure(func, repeats: int) -> dict:
+    """Runs `func` (which receives the run number) `repeats` times and returns its measurements."""
+    from beetsplug import api
+
+    timings = []
+    result = {}
+    for n in range(repeats):
+        api.search_cache.clear()
+        requests_before = api.http_client.request_count
+        bytes_before = api.http_client.bytes_received
+        if n == 0:
+            tracemalloc.start()
+        start = time.perf_counter()
+        func(n)
+        timings.append(time.perf_counter() - start)
+        if n == 0:
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            result = {
+                "requests": api.http_client.request_count - requests_before,
+                "bytes": api.http_client.bytes_received - bytes_before,
+                "peak_memory_bytes": peak,
+            }
+    # the first run is slowed down by tracemalloc, so leave it out when possible
+    result["wall_time_s"] = statistics.median(timings[1:] if len(timings) > 1 else timings)
+    return result
+
+
+def run_benchmarks(options) -> dict:
+    from beets.autotag.distance import Distance
+    from beets.autotag.hooks import AlbumMatch
+
+    fixtures_dir = options.fixtures
+    asin = options.asin
+    if options.synthetic:
+        fixtures_dir = tempfile.mkdtemp(prefix="beets-audible-fixtures-")
+        asin = write_synthetic_fixtures(fixtures_dir, options.products, options.chapters, options.album, options.artist)
+
+    plugin = create_plugin(fixtures_dir)
+    items = create_items(options.files, options.chapters * 30 * 60, options.album, options.artist)
+    album_info = plugin.get_album_info(asin, options.region)
+
+    stages = {
+        "candidates": lambda n: plugin.candidates(items, options.artist, options.album, False),
+        "get_album_info": lambda n: plugin.get_album_info(asin, options.region),
+        "maybe_align_tracks_with_items": lambda n: plugin.maybe_align_tracks_with_items(
+            copy.deepcopy(album_info), items
+        ),
+        "on_album_matched": lambda n: plugin.on_album_matched(
+            AlbumMatch(
+                distance=Distance(),
+                info=copy.deepcopy(album_info),
+                mapping={},
+                extra_items=list(items),
+                extra_tracks=[],
+            )
+        ),
+    }
+    return {
+        "params": {
+            "files": options.files,
+            "chapters": options.chapters,
+            "products": options.products,
+            "synthetic": options.synthetic,
+        },
+        "stages": {name: measure(func, options.repeats) for name, func in stages.items()},
+    }
+
+
+def print_results(results: dict, baseline: dict | None) -> None:
+    print(f"{'stage':32} {'wall ms':>10} {'requests':>9} {'KiB':>9} {'peak KiB':>10}")
+    for name, stage in results["stages"].items():
+        line = (
+            f"{name:32} {stage['wall_time_s'] * 1000:10.1f} {stage['requests']:9d}"
+            f" {stage['bytes'] / 1024:9.1f} {stage['peak_memory_bytes'] / 1024:10.1f}"
+        )
+        base = (baseline or {}).get("stages", {}).get(name)
+        if base and base["wall_time_s"]:
+            line += f"   ({stage['wall_time_s'] / base['wall_time_s']:.2f}x baseline time)"
+        print(line)
+
+
+def find_regressions(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    regressions = []
+    for name, stage in results["stages"].items():
+        base = baseline.get("stages", {}).get(name)
+        if not base:
+            continue
+        if stage["wall_time_s"] > base["wall_time_s"] * (1 + tolerance):
+            regressions.append(f"{name}: wall time {base['wall_time_s']:.4f}s -> {stage['wall_time_s']:.4f}s")
+        if stage["peak_memory_bytes"] > base["peak_memory_bytes"] * (1 + tolerance):
+            regressions.append(f"{name}: peak memory {base['peak_memory_bytes']} -> {stage['peak_memory_bytes']} bytes")
+        if stage["requests"] > base["requests"]:
+            regressions.append(f"{name}: requests {base['requests']} -> {stage['requests']}")
+    return regressions
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--synthetic", action="store_true", help="generate fixtures for a synthetic book")
+    source.add_argument("--fixtures", help="directory of recorded fixtures")
+    parser.add_argument("--asin", help="ASIN of a recorded book, required with --fixtures")
+    parser.add_argument("--album", default=SYNTHETIC_ALBUM)
+    parser.add_argument("--artist", default=SYNTHETIC_ARTIST)
+    parser.add_argument("--region", default="us")
+    parser.add_argument("--files", type=int, default=300, help="number of files in the synthetic import")
+    parser.add_argument("--chapters", type=int, default=40, help="number of chapters of synthetic books")
+    parser.add_argument("--products", type=int, default=10, help="number of synthetic search results")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--save-baseline", metavar="PATH", help="save the results as a baseline")
+    parser.add_argument("--compare", metavar="PATH", help="compare against a saved baseline, failing on regressions")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed relative slowdown, default 0.2")
+    options = parser.parse_args(argv)
+    if options.fixtures and not options.asin:
+        parser.error("--asin is required with --fixtures")
+    return options
+
+
+def main(argv=None) -> int:
+    options = parse_args(argv)
+    results = run_benchmarks(options)
+
+    baseline = None
+    if options.compare:
+        with open(options.compare) as f:
+            baseline = json.load(f)
+    print_results(results, baseline)
+
+    if options.save_baseline:
+        with open(options.save_baseline, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Saved baseline to {options.save_baseline}")
+
+    if baseline:
+        regressions = find_regressions(results, baseline, options.tolerance)
+        for regression in regressions:
+            print(f"Regression: {regression}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,119 @@
+"""
+Measures how much loading the plugin adds to the startup of beets commands which don't look up books.
+
+A command (`beet ls` by default) is run with and without the plugin enabled, with `python -X importtime`.
+The median wall time of both, and the modules which are only imported when the plugin is enabled, are reported.
+
+    uv run python scripts/importtime.py
+    uv run python scripts/importtime.py --command stats --repeats 20
+
+Fails if any of the modules which should only be loaded when books are looked up or written are imported.
+"""
+
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# modules which are only needed when books are looked up, matched or written
+DEFERRED_MODULES = (
+    "markdownify",
+    "bs4",
+    "natsort",
+    "beetsplug.goodreads",
+    "cProfile",
+    "pstats",
+)
+
+IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)")
+
+
+def parse_importtime(output: str) -> dict[str, int]:
+    """Returns the time spent importing each module itself, in microseconds, from `-X importtime` output."""
+    modules = {}
+    for line in output.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            modules[match.group(4)] = int(match.group(1))
+    return modules
+
+
+def write_beets_dir(directory: str, plugins: list[str]) -> str:
+    beets_dir = os.path.join(directory, "with-plugin" if plugins else "without-plugin")
+    os.makedirs(beets_dir)
+    with open(os.path.join(beets_dir, "config.yaml"), "w") as f:
+        f.write(f"plugins: [{', '.join(plugins)}]\n")
+        f.write(f"directory: {os.path.join(directory, 'music')}\n")
+        f.write(f"library: {os.path.join(beets_dir, 'library.db')}\n")
+    return beets_dir
+
+
+def run_command(beets_dir: str, command: list[str], env: dict[str, str]) -> tuple[float, dict[str, int]]:
+    env = {**env, "BEETSDIR": beets_dir}
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-m", "beets", *command],
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        text=True,
+        check=True,
+    )
+    return time.perf_counter() - start, parse_importtime(result.stderr)
+
+
+def measure(beets_dir: str, command: list[str], env: dict[str, str], repeats: int) -> tuple[float, dict[str, int]]:
+    """Returns the median wall time of the command and the import times of its last run."""
+    # the first run writes the bytecode cache, like the first run after installing the plugin would
+    run_command(beets_dir, command, env)
+    timings = []
+    modules = {}
+    for _ in range(repeats):
+        wall_time, modules = run_command(beets_dir, command, env)
+        timings.append(wall_time)
+    return statistics.median(timings), modules
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--command", default="ls", help="beets command to run, default ls")
+    parser.add_argument("--repeats", type=int, default=10)
+    parser.add_argument("--top", type=int, default=15, help="number of slowest plugin modules to show")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    options = parse_args(argv)
+    command = options.command.split()
+    directory = tempfile.mkdtemp(prefix="beets-audible-importtime-")
+
+    env = os.environ.copy()
+    env.pop("PYTHONDONTWRITEBYTECODE", None)
+    # keep the bytecode out of the working tree, and don't let an existing cache skew the first run
+    env["PYTHONPYCACHEPREFIX"] = os.path.join(directory, "pycache")
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, (REPO_ROOT, env.get("PYTHONPATH"))))
+
+    base_time, base_modules = measure(write_beets_dir(directory, []), command, env, options.repeats)
+    plugin_time, plugin_modules = measure(write_beets_dir(directory, ["audible"]), command, env, options.repeats)
+
+    added = {name: us for name, us in plugin_modules.items() if name not in base_modules}
+    print(f"beet {options.command} without the plugin: {base_time * 1000:8.1f} ms")
+    print(f"beet {options.command} with the plugin:    {plugin_time * 1000:8.1f} ms")
+    print(f"Modules imported by the plugin: {len(added)}, taking {sum(added.values()) / 1000:.1f} ms")
+    for name, us in sorted(added.items(), key=lambda m: m[1], reverse=True)[: options.top]:
+        print(f"  {name:40} {us / 1000:6.1f} ms")
+
+    deferred = sorted(name for name in added if name.split(".")[0] in DEFERRED_MODULES or name in DEFERRED_MODULES)
+    for name in deferred:
+        print(f"Imported at startup, but should only be loaded when needed: {name}")
+    return 1 if deferred else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,116 @@
+"""
+Local stand-in for the Audible catalog, Audnex and cover art hosts, serving recorded fixtures.
+
+Point the plugin at it with the `api_base_url` option, see development.md. Requests are expected
+in the form `/<original host>/<original path>?<original query>`, which is what `api_base_url` produces.
+
+    python scripts/standin_server.py --fixtures audible_fixtures --latency 300 --error-rate-429 0.05
+"""
+
+import argparse
+import gzip
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from beetsplug.replay import load_fixture
+
+
+class StandinHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: "StandinServer"
+
+    def do_GET(self) -> None:
+        host, _, path = self.path.lstrip("/").partition("/")
+        url = f"https://{host}/{path}"
+        options = self.server.options
+
+        delay = options.latency + random.uniform(0, options.latency_jitter)
+        if delay:
+            time.sleep(delay / 1000)
+
+        roll = random.random()
+        if roll < options.error_rate_429:
+            self.server.count("429")
+            self.send_error_response(429, {"Retry-After": str(options.retry_after)})
+            return
+        if roll < options.error_rate_429 + options.error_rate_5xx:
+            self.server.count("5xx")
+            self.send_error_response(random.choice((500, 502, 503)), {})
+            return
+
+        response = load_fixture(options.fixtures, url)
+        if response is None:
+            self.server.count("missing")
+            self.log_message("no fixture for %s", url)
+            self.send_error_response(404, {})
+            return
+
+        self.server.count(str(response.status))
+        body = response.body
+        self.send_response(response.status, response.reason)
+        for k, v in response.headers.items():
+            self.send_header(k, v)
+        if "gzip" in self.headers.get("Accept-Encoding", "") and len(body) > 512:
+            body = gzip.compress(body)
+            self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_error_response(self, status: int, headers: dict[str, str]) -> None:
+        self.send_response(status)
+        for k, v in headers.items():
+            self.send_header(k, v)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, format, *args) -> None:
+        if not self.server.options.quiet:
+            super().log_message(format, *args)
+
+
+class StandinServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, options):
+        super().__init__(address, StandinHandler)
+        self.options = options
+        self.counts: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def count(self, outcome: str) -> None:
+        with self._lock:
+            self.counts[outcome] = self.counts.get(outcome, 0) + 1
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--fixtures", required=True, help="directory of fixtures recorded with replay_mode: record")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--latency", type=float, default=0, help="milliseconds to wait before every response")
+    parser.add_argument("--latency-jitter", type=float, default=0, help="random extra milliseconds of latency")
+    parser.add_argument("--error-rate-429", type=float, default=0, help="fraction of requests answered with a 429")
+    parser.add_argument("--error-rate-5xx", type=float, default=0, help="fraction of requests answered with a 5xx")
+    parser.add_argument("--retry-after", type=int, default=1, help="Retry-After value sent with 429 responses")
+    parser.add_argument("--quiet", action="store_true", help="don't log every request")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> None:
+    options = parse_args(argv)
+    server = StandinServer((options.host, options.port), options)
+    print(f"Serving {options.fixtures} on http://{options.host}:{server.server_address[1]}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(f"Responses: {server.counts}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+import os
+
+import beets.plugins
+import mediafile
+import pytest
+from beets.test.helper import PluginMixin, TestHelper
+
+import beetsplug
+
+# importing beets' test helpers limits the beetsplug package to beets' own plugins, so this one is added back
+beetsplug.__path__.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "beetsplug"))
+
+
+class AudibleTestHelper(PluginMixin, TestHelper):
+    plugin = "audible"
+    preload_plugin = False
+
+
+@pytest.fixture
+def helper():
+    """A pristine beets configuration and an in-memory library, in a temporary directory."""
+    helper = AudibleTestHelper()
+    helper.setup_beets()
+    yield helper
+    helper.teardown_beets()
+
+
+@pytest.fixture
+def plugin(helper, tmp_path):
+    """The plugin, configured so that it never uses the network or writes outside of the test's directory."""
+    helper.config["audible"].set(
+        {
+            "replay_mode": "replay",
+            "replay_dir": str(tmp_path / "fixtures"),
+            "cache": False,
+            "cover_cache": False,
+            "fetch_art": False,
+            "rate_limit": 0,
+            "stats": False,
+        }
+    )
+    media_fields = set(vars(mediafile.MediaFile))
+    helper.load_plugins()
+    yield next(p for p in beets.plugins.find_plugins() if p.name == "audible")
+    helper.unload_plugins()
+    # the fields the plugin added can't be added again by the next test's plugin otherwise
+    for name in set(vars(mediafile.MediaFile)) - media_fields:
+        delattr(mediafile.MediaFile, name)
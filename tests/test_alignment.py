@@ -0,0 +1,118 @@
+import itertools
+import random
+
+import pytest
+
+from beetsplug.alignment import Segment, align_chapters, match_boundaries
+
+
+def test_files_with_several_chapters_are_merged():
+    segments = align_chapters([180, 120, 60], [60] * 6)
+    assert segments == [Segment(0, 2), Segment(3, 4), Segment(5, 5)]
+
+
+def test_chapters_are_split_between_files():
+    segments = align_chapters([60, 60, 60], [120, 60])
+    assert segments == [Segment(0, 0, 1, 2), Segment(0, 0, 2, 2), Segment(1, 1)]
+
+
+def test_files_are_scaled_to_the_chapters():
+    # the files leave out a 10 second intro, which shouldn't move the end of the last files to the next chapter
+    segments = align_chapters([95, 100, 100, 100], [100, 100, 100, 100])
+    assert segments == [Segment(i, i) for i in range(4)]
+
+
+def test_one_file_gets_every_chapter():
+    assert align_chapters([300], [100, 100, 100]) == [Segment(0, 2)]
+
+
+def test_same_number_of_files_and_chapters():
+    assert align_chapters([60, 90], [50, 100]) == [Segment(0, 0), Segment(1, 1)]
+
+
+@pytest.mark.parametrize(
+    ("file_lengths", "expected"),
+    [
+        ([52.5, 52.5], [Segment(0, 0), Segment(1, 1)]),  # 5% longer
+        ([47.5, 47.5], [Segment(0, 0), Segment(1, 1)]),  # 5% shorter
+        ([52.6, 52.5], None),
+        ([47.4, 47.5], None),
+    ],
+)
+def test_runtime_tolerance(file_lengths, expected):
+    assert align_chapters(file_lengths, [50, 50]) == expected
+
+
+def test_zero_length_chapters_are_kept():
+    segments = align_chapters([60, 60], [60, 0, 60])
+    assert segments == [Segment(0, 0), Segment(1, 2)]
+
+
+def test_zero_length_files_are_kept():
+    segments = align_chapters([60, 0, 60], [60, 60])
+    assert segments == [Segment(0, 0), Segment(1, 1, 1, 2), Segment(1, 1, 2, 2)]
+
+
+@pytest.mark.parametrize(
+    ("file_lengths", "chapter_lengths"),
+    [([], [60]), ([60], []), ([0, 0], [60, 60]), ([60, 60], [0, 0])],
+)
+def test_nothing_to_align(file_lengths, chapter_lengths):
+    assert align_chapters(file_lengths, chapter_lengths) is None
+
+
+@pytest.mark.parametrize(("files", "chapters"), [(3, 10), (10, 3), (7, 7), (1, 5), (5, 1)])
+def test_segments_cover_every_chapter_in_order(files, chapters):
+    rng = random.Random(files * 100 + chapters)
+    chapter_lengths = [rng.uniform(60, 600) for _ in range(chapters)]
+    file_lengths = [rng.uniform(60, 600) for _ in range(files)]
+    scale = sum(chapter_lengths) / sum(file_lengths)
+    segments = align_chapters([length * scale for length in file_lengths], chapter_lengths)
+
+    assert len(segments) == files
+    covered = []
+    for segment in segments:
+        if segment.part == 1:
+            covered.extend(range(segment.first_chapter, segment.last_chapter + 1))
+    assert covered == list(range(chapters))
+
+
+@pytest.mark.parametrize(
+    ("segment", "title"),
+    [
+        (Segment(0, 0), "Opening"),
+        (Segment(0, 2), "Opening - Chapter 2"),
+        (Segment(1, 1, 2, 3), "Chapter 1 (Part 2)"),
+    ],
+)
+def test_segment_titles(segment, title):
+    assert segment.get_title(["Opening", "Chapter 1", "Chapter 2"]) == title
+
+
+def get_total_distance(short, long, matches) -> float:
+    return sum(abs(s - long[m]) for s, m in zip(short, matches, strict=True))
+
+
+def test_match_boundaries_without_times():
+    assert match_boundaries([], [1.0, 2.0]) == []
+
+
+def test_match_boundaries_of_the_same_length():
+    assert match_boundaries([1.0, 5.0], [2.0, 3.0]) == [0, 1]
+
+
+def test_match_boundaries_picks_the_closest_times_in_order():
+    assert match_boundaries([10.0, 11.0], [9.0, 10.5, 30.0]) == [0, 1]
+    assert match_boundaries([20.0], [9.0, 10.5, 30.0]) == [1]
+
+
+def test_match_boundaries_is_optimal():
+    rng = random.Random(0)
+    for _ in range(200):
+        long = sorted(rng.uniform(0, 100) for _ in range(rng.randint(1, 8)))
+        short = sorted(rng.uniform(0, 100) for _ in range(rng.randint(1, len(long))))
+        matches = match_boundaries(short, long)
+
+        assert matches == sorted(set(matches))
+        best = min(get_total_distance(short, long, c) for c in itertools.combinations(range(len(long)), len(short)))
+        assert get_total_distance(short, long, matches) == pytest.approx(best)
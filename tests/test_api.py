@@ -0,0 +1,49 @@
+import pytest
+
+from beetsplug.api import AUDIBLE_REGIONS, get_audible_album_region, get_audible_album_url
+
+
+@pytest.mark.parametrize(
+    ("url", "region"),
+    [
+        ("https://www.audible.com/pd/B0036UC2LO", "us"),
+        ("https://www.audible.co.uk/pd/B0036UC2LO", "uk"),
+        ("https://www.audible.com.au/pd/B0036UC2LO", "au"),
+        ("https://www.audible.co.jp/pd/B0036UC2LO", "jp"),
+        ("https://www.audible.ca/pd/B0036UC2LO", "ca"),
+        ("https://www.audible.de/pd/B0036UC2LO", "de"),
+        ("https://www.audible.es/pd/B0036UC2LO", "es"),
+        ("https://www.audible.fr/pd/B0036UC2LO", "fr"),
+        ("https://www.audible.in/pd/B0036UC2LO", "in"),
+        ("https://www.audible.it/pd/B0036UC2LO", "it"),
+        # urls as they're often pasted
+        ("audible.co.uk/pd/B0036UC2LO", "uk"),
+        ("www.audible.com.au/pd/B0036UC2LO", "au"),
+        ("HTTPS://WWW.AUDIBLE.CO.JP/pd/B0036UC2LO", "jp"),
+        ("https://www.audible.co.uk./pd/B0036UC2LO", "uk"),
+        ("https://www.audible.co.uk:443/pd/B0036UC2LO?ref=a", "uk"),
+    ],
+)
+def test_get_audible_album_region(url, region):
+    assert get_audible_album_region(url) == region
+
+
+@pytest.mark.parametrize("region", AUDIBLE_REGIONS)
+def test_get_audible_album_region_of_album_urls(region):
+    assert get_audible_album_region(get_audible_album_url("B0036UC2LO", region)) == region
+
+
+@pytest.mark.parametrize(
+    "url",
+    [
+        # Audible's Brazilian store isn't supported by Audnex
+        "https://www.audible.com.br/pd/B0036UC2LO",
+        "https://www.example.org/pd/B0036UC2LO",
+        "https://localhost/pd/B0036UC2LO",
+        "B0036UC2LO",
+        "",
+        "https://[::1/pd/B0036UC2LO",
+    ],
+)
+def test_get_audible_album_region_of_unknown_hosts(url):
+    assert get_audible_album_region(url) is None
@@ -0,0 +1,86 @@
+from concurrent.futures import Future
+from types import SimpleNamespace
+
+from beets import importer
+from beets.autotag.distance import Distance
+from beets.autotag.hooks import AlbumInfo, AlbumMatch
+from beets.library import Item
+
+from beetsplug.audible import get_task_key
+
+COVER_URL = "https://m.media-amazon.com/images/I/B0036UC2LO.jpg"
+
+
+class Task(SimpleNamespace):
+    """The parts of an import task which fetching art uses."""
+
+    __hash__ = object.__hash__
+
+
+def make_task(tmp_path, choice=importer.Action.APPLY, artpath=None):
+    info = AlbumInfo(tracks=[], album="The Way of Kings", album_id="B0036UC2LO", cover_url=COVER_URL)
+    items = [Item(path=str(tmp_path / "The Way of Kings" / "Part 1.mp3").encode())]
+    return Task(
+        items=items,
+        is_album=True,
+        choice_flag=choice,
+        match=AlbumMatch(distance=Distance(), info=info, mapping={}, extra_items=[], extra_tracks=[]),
+        album=SimpleNamespace(artpath=artpath, asin="B0036UC2LO", album="The Way of Kings", albumartist="Brandon"),
+    )
+
+
+def test_prefetched_art_of_albums_with_art_is_discarded(plugin, tmp_path):
+    artpath = tmp_path / "cover.jpg"
+    artpath.touch()
+    future = Future()
+    plugin.art_prefetches[COVER_URL] = future
+
+    plugin.fetch_art(None, make_task(tmp_path, artpath=str(artpath).encode()))
+
+    assert plugin.art_prefetches == {}
+    assert future.cancelled()
+
+
+def test_prefetched_art_is_collected(plugin, tmp_path):
+    plugin.config["fetch_art"] = True
+    plugin.cover_art_urls["B0036UC2LO"] = COVER_URL
+    future = Future()
+    future.set_result(b"/tmp/cover.jpg")
+    plugin.art_prefetches[COVER_URL] = future
+    task = make_task(tmp_path)
+
+    plugin.fetch_art(None, task)
+
+    assert plugin.art_prefetches == {}
+    assert plugin.cover_art[task] == (COVER_URL, b"/tmp/cover.jpg")
+
+
+def test_prefetches_of_earlier_searches_are_cancelled(plugin, tmp_path, monkeypatch):
+    plugin.config["fetch_art"] = True
+    plugin.config["prefetch_art"] = True
+    monkeypatch.setattr(plugin.art_executor, "submit", lambda *args: Future())
+    released = []
+    monkeypatch.setattr(plugin, "release_cover", released.append)
+    task = make_task(tmp_path)
+    task_key = get_task_key(task.items)
+    other_url = "https://m.media-amazon.com/images/I/B0041JKFJW.jpg"
+    re_searched_url = "https://m.media-amazon.com/images/I/B00APDZG8Y.jpg"
+
+    plugin.prefetch_art(
+        task_key,
+        [AlbumInfo(tracks=[], cover_url=url, data_source=plugin.data_source) for url in (COVER_URL, other_url)],
+    )
+    # the user searched again, e.g with "E", and picked a candidate of the new search
+    plugin.prefetch_art(
+        task_key,
+        [AlbumInfo(tracks=[], cover_url=url, data_source=plugin.data_source) for url in (re_searched_url, COVER_URL)],
+    )
+    prefetches = dict(plugin.art_prefetches)
+    task.candidates = []
+    plugin.on_import_task_choice(None, task)
+
+    assert sorted(released) == sorted([other_url, re_searched_url])
+    assert prefetches[other_url].cancelled()
+    assert prefetches[re_searched_url].cancelled()
+    assert list(plugin.art_prefetches) == [COVER_URL]
+    assert task_key not in plugin.task_art_prefetches
@@ -0,0 +1,291 @@
+import http.server
+import os
+import threading
+from typing import ClassVar
+
+import pytest
+
+from beetsplug import api, cache
+from beetsplug.cache import CoverCache, ResponseCache
+from beetsplug.client import HTTPClient
+
+
+class Clock:
+    def __init__(self, now: float = 1_700_000_000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache.time, "time", clock)
+    return clock
+
+
+@pytest.fixture
+def response_cache(tmp_path):
+    response_cache = ResponseCache(str(tmp_path / "responses.db"), ttl=60, max_entries=3)
+    yield response_cache
+    response_cache.close()
+
+
+def test_response_cache_round_trip(response_cache, clock):
+    assert response_cache.get("B0036UC2LO", "us", "book") is None
+    response_cache.set("B0036UC2LO", "us", "book", b'{"asin": "B0036UC2LO"}')
+    assert response_cache.get("B0036UC2LO", "us", "book") == b'{"asin": "B0036UC2LO"}'
+    assert response_cache.get("B0036UC2LO", "uk", "book") is None
+    assert response_cache.get("B0036UC2LO", "us", "chapters") is None
+
+
+def test_response_cache_persists(tmp_path, clock):
+    path = str(tmp_path / "responses.db")
+    response_cache = ResponseCache(path)
+    response_cache.set("B0036UC2LO", "us", "book", b"{}")
+    response_cache.close()
+    assert ResponseCache(path).get("B0036UC2LO", "us", "book") == b"{}"
+
+
+def test_response_cache_replaces_entries(response_cache, clock):
+    response_cache.set("B0036UC2LO", "us", "book", b"old")
+    response_cache.set("B0036UC2LO", "us", "book", b"new")
+    assert response_cache.get("B0036UC2LO", "us", "book") == b"new"
+    assert response_cache.stats()["entries"] == 1
+
+
+def test_response_cache_expires_entries(response_cache, clock):
+    response_cache.set("B0036UC2LO", "us", "book", b"{}")
+    clock.now += 60
+    assert response_cache.get("B0036UC2LO", "us", "book") == b"{}"
+    clock.now += 1
+    assert response_cache.get("B0036UC2LO", "us", "book") is None
+    assert response_cache.stats()["expired"] == 1
+    # reading an entry doesn't make it fresh again
+    response_cache.set("B002V0QK4C", "us", "book", b"{}")
+    clock.now += 30
+    response_cache.get("B002V0QK4C", "us", "book")
+    clock.now += 31
+    assert response_cache.get("B002V0QK4C", "us", "book") is None
+
+
+def test_response_cache_max_age(response_cache, clock):
+    response_cache.set("B0036UC2LO", "us", "search", b"[]")
+    clock.now += 10
+    assert response_cache.get("B0036UC2LO", "us", "search", max_age=10) == b"[]"
+    clock.now += 1
+    assert response_cache.get("B0036UC2LO", "us", "search", max_age=10) is None
+    assert response_cache.get("B0036UC2LO", "us", "search") == b"[]"
+
+
+def test_response_cache_without_ttl_never_expires(tmp_path, clock):
+    response_cache = ResponseCache(str(tmp_path / "responses.db"))
+    response_cache.set("B0036UC2LO", "us", "book", b"{}")
+    clock.now += 10 * 365 * 24 * 60 * 60
+    assert response_cache.get("B0036UC2LO", "us", "book") == b"{}"
+
+
+def test_response_cache_evicts_least_recently_used(tmp_path, clock):
+    response_cache = ResponseCache(str(tmp_path / "responses.db"), max_entries=3)
+    for asin in ("A", "B", "C"):
+        response_cache.set(asin, "us", "book", asin.encode())
+        clock.now += 1
+    # reading A makes B the least recently used entry, once reading it is recorded
+    clock.now += ResponseCache.ACCESS_TIME_RESOLUTION
+    assert response_cache.get("A", "us", "book") == b"A"
+    clock.now += 1
+    response_cache.set("D", "us", "book", b"D")
+    assert response_cache.get("B", "us", "book") is None
+    assert [response_cache.get(asin, "us", "book") for asin in ("A", "C", "D")] == [b"A", b"C", b"D"]
+    assert response_cache.stats()["entries"] == 3
+    response_cache.close()
+
+
+def test_response_cache_reads_dont_write(response_cache, clock):
+    response_cache.set("A", "us", "book", b"A")
+    changes = response_cache._connection().total_changes
+    clock.now += 30
+    for _ in range(10):
+        assert response_cache.get("A", "us", "book") == b"A"
+    assert response_cache._connection().total_changes == changes
+
+
+def test_response_cache_vacuum_removes_expired_entries(response_cache, clock):
+    response_cache.set("A", "us", "book", b"A")
+    clock.now += 61
+    response_cache.set("B", "us", "book", b"B")
+    assert response_cache.vacuum() == 1
+    assert response_cache.stats()["entries"] == 1
+    assert response_cache.get("B", "us", "book") == b"B"
+
+
+def test_response_cache_clear(response_cache, clock):
+    response_cache.set("A", "us", "book", b"A")
+    response_cache.set("A", "us", "chapters", b"A")
+    assert response_cache.clear() == 2
+    assert response_cache.get("A", "us", "book") is None
+
+
+@pytest.fixture
+def cover_cache(tmp_path):
+    cover_cache = CoverCache(str(tmp_path / "covers"), ttl=60, max_size=250)
+    yield cover_cache
+    cover_cache.close()
+
+
+def add_cover(cover_cache: CoverCache, url: str, body: bytes, etag: str | None = None) -> str:
+    with cover_cache.create_temp_file(".jpg") as fh:
+        fh.write(body)
+    return cover_cache.add(url, fh.name, ".jpg", etag, None)
+
+
+def test_cover_cache_round_trip(cover_cache, clock):
+    assert cover_cache.get("https://m.media-amazon.com/a.jpg") is None
+    path = add_cover(cover_cache, "https://m.media-amazon.com/a.jpg", b"a" * 100, etag='"a"')
+    with open(path, "rb") as f:
+        assert f.read() == b"a" * 100
+    cached = cover_cache.get("https://m.media-amazon.com/a.jpg")
+    assert (cached.path, cached.etag, cached.is_fresh) == (path, '"a"', True)
+    # only the image is left in the cache directory
+    assert not [name for name in os.listdir(cover_cache.directory) if name.endswith(".tmp")]
+
+
+def test_cover_cache_stores_each_image_once(cover_cache, clock):
+    path = add_cover(cover_cache, "https://m.media-amazon.com/a.jpg", b"a" * 100)
+    assert add_cover(cover_cache, "https://m.media-amazon.com/b.jpg", b"a" * 100) == path
+    assert cover_cache.stats() == {"path": cover_cache.directory, "urls": 2, "images": 1, "size_bytes": 100}
+
+
+def test_cover_cache_removes_replaced_images(cover_cache, clock):
+    old_path = add_cover(cover_cache, "https://m.media-amazon.com/a.jpg", b"a" * 100)
+    new_path = add_cover(cover_cache, "https://m.media-amazon.com/a.jpg", b"b" * 100)
+    assert not os.path.exists(old_path)
+    assert cover_cache.get("https://m.media-amazon.com/a.jpg").path == new_path
+
+
+def test_cover_cache_revalidates_old_covers(cover_cache, clock):
+    add_cover(cover_cache, "https://m.media-amazon.com/a.jpg", b"a" * 100, etag='"a"')
+    clock.now += 61
+    cached = cover_cache.get("https://m.media-amazon.com/a.jpg")
+    assert (cached.etag, cached.is_fresh) == ('"a"', False)
+    cover_cache.mark_checked("https://m.media-amazon.com/a.jpg")
+    assert cover_cache.get("https://m.media-amazon.com/a.jpg").is_fresh
+
+
+def test_cover_cache_evicts_least_recently_used(cover_cache, clock):
+    a = add_cover(cover_cache, "https://m.media-amazon.com/a.jpg", b"a" * 100)
+    clock.now += 1
+    b = add_cover(cover_cache, "https://m.media-amazon.com/b.jpg", b"b" * 100)
+    clock.now += 1
+    cover_cache.get("https://m.media-amazon.com/a.jpg")
+    clock.now += 1
+    c = add_cover(cover_cache, "https://m.media-amazon.com/c.jpg", b"c" * 100)
+    assert cover_cache.get("https://m.media-amazon.com/b.jpg") is None
+    assert not os.path.exists(b)
+    assert os.path.exists(a)
+    assert os.path.exists(c)
+    assert cover_cache.stats()["size_bytes"] == 200
+
+
+def test_cover_cache_keeps_the_added_cover(cover_cache, clock):
+    add_cover(cover_cache, "https://m.media-amazon.com/a.jpg", b"a" * 100)
+    clock.now += 1
+    path = add_cover(cover_cache, "https://m.media-amazon.com/b.jpg", b"b" * 300)
+    assert cover_cache.get("https://m.media-amazon.com/a.jpg") is None
+    assert cover_cache.get("https://m.media-amazon.com/b.jpg").path == path
+
+
+def test_cover_cache_keeps_held_covers(cover_cache, clock):
+    a = add_cover(cover_cache, "https://m.media-amazon.com/a.jpg", b"a" * 100)
+    clock.now += 1
+    b = add_cover(cover_cache, "https://m.media-amazon.com/b.jpg", b"b" * 100)
+    clock.now += 1
+    cover_cache.hold("https://m.media-amazon.com/a.jpg")
+    cover_cache.hold("https://m.media-amazon.com/a.jpg")
+    add_cover(cover_cache, "https://m.media-amazon.com/c.jpg", b"c" * 100)
+    assert os.path.exists(a)
+    assert not os.path.exists(b)
+    clock.now += 1
+    # held covers can be evicted once they're released as many times as they were held
+    cover_cache.release("https://m.media-amazon.com/a.jpg")
+    add_cover(cover_cache, "https://m.media-amazon.com/d.jpg", b"d" * 100)
+    assert os.path.exists(a)
+    cover_cache.release("https://m.media-amazon.com/a.jpg")
+    add_cover(cover_cache, "https://m.media-amazon.com/e.jpg", b"e" * 100)
+    assert not os.path.exists(a)
+
+
+def test_cover_cache_removes_stale_temp_files(tmp_path, clock):
+    directory = tmp_path / "covers"
+    directory.mkdir()
+    stale, recent = directory / "download-stale.jpg.tmp", directory / "download-recent.jpg.tmp"
+    stale.touch()
+    recent.touch()
+    os.utime(stale, (clock.now - CoverCache.STALE_TEMP_FILE_AGE - 1,) * 2)
+    os.utime(recent, (clock.now - 60,) * 2)
+    cover_cache = CoverCache(str(directory))
+    assert cover_cache.get("https://m.media-amazon.com/a.jpg") is None
+    assert not stale.exists()
+    # it may still be being downloaded to
+    assert recent.exists()
+    cover_cache.close()
+
+
+class CoverHandler(http.server.BaseHTTPRequestHandler):
+    body = b"cover"
+    etag = '"v1"'
+    requests: ClassVar[list[str | None]] = []
+
+    def do_GET(self):
+        if_none_match = self.headers.get("If-None-Match")
+        self.requests.append(if_none_match)
+        if if_none_match == self.etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("ETag", self.etag)
+        self.send_header("Content-Length", str(len(self.body)))
+        self.end_headers()
+        self.wfile.write(self.body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def cover_server(monkeypatch):
+    CoverHandler.requests = []
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), CoverHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    monkeypatch.setattr(api, "http_client", HTTPClient(base_url=f"http://127.0.0.1:{server.server_port}"))
+    yield CoverHandler
+    server.shutdown()
+    server.server_close()
+
+
+def test_fetch_image_revalidates_cached_covers(plugin, cover_cache, cover_server, clock, monkeypatch):
+    monkeypatch.setattr(plugin, "cover_cache", cover_cache)
+    url = "https://m.media-amazon.com/images/I/cover.jpg"
+    path = plugin.fetch_image(url)
+    with open(path, "rb") as f:
+        assert f.read() == b"cover"
+    # fresh covers are used without a request
+    assert plugin.fetch_image(url) == path
+    assert cover_server.requests == [None]
+
+    clock.now += 61
+    assert plugin.fetch_image(url) == path
+    assert cover_server.requests == [None, '"v1"']
+    assert cover_cache.get(url).is_fresh
+
+    clock.now += 61
+    monkeypatch.setattr(cover_server, "body", b"new cover")
+    monkeypatch.setattr(cover_server, "etag", '"v2"')
+    new_path = plugin.fetch_image(url)
+    with open(new_path, "rb") as f:
+        assert f.read() == b"new cover"
+    assert cover_cache.get(url).etag == '"v2"'
+    assert not [name for name in os.listdir(cover_cache.directory) if name.endswith(".tmp")]
@@ -0,0 +1,53 @@
+import shutil
+
+import pytest
+
+from beetsplug import api
+from beetsplug.cache import ResponseCache
+from beetsplug.replay import FixtureNotFoundError, save_fixture
+from tests.test_replay import ALBUM, ARTIST, save_book_fixtures
+
+SEARCH_RESPONSE = f"""<?xml version="1.0" encoding="UTF-8"?>
+<GoodreadsResponse>
+  <search>
+    <total-results>1</total-results>
+    <results>
+      <work>
+        <original_publication_year>2010</original_publication_year>
+        <original_publication_month>8</original_publication_month>
+        <original_publication_day>31</original_publication_day>
+        <best_book>
+          <id>7235533</id>
+          <title>{ALBUM} (The Stormlight Archive, #1)</title>
+          <author><name>{ARTIST}</name></author>
+        </best_book>
+      </work>
+    </results>
+  </search>
+</GoodreadsResponse>
+"""
+
+
+@pytest.fixture
+def response_cache(plugin, tmp_path, monkeypatch):
+    plugin.config["goodreads_apikey"] = "secret"
+    response_cache = ResponseCache(str(tmp_path / "responses.db"))
+    monkeypatch.setattr(api, "response_cache", response_cache)
+    yield response_cache
+    response_cache.close()
+
+
+def test_goodreads_responses_are_cached(plugin, response_cache, tmp_path):
+    fixtures_dir = tmp_path / "fixtures"
+    save_book_fixtures(str(fixtures_dir), "B0SYNTH000", ALBUM, 4)
+    url = api.get_goodreads_search_url("secret", "B0SYNTH000")
+    save_fixture(str(fixtures_dir), url, 200, "OK", {"Content-Type": "application/xml"}, SEARCH_RESPONSE.encode())
+
+    assert plugin.get_album_info("B0SYNTH000", "us").original_year == 2010
+    # e.g imported right after the book was prefetched, without the network
+    shutil.rmtree(fixtures_dir)
+    album_info = plugin.get_album_info("B0SYNTH000", "us")
+    assert (album_info.original_year, album_info.original_month, album_info.original_day) == (2010, 8, 31)
+
+    with pytest.raises(FixtureNotFoundError):
+        plugin.get_album_info("B0SYNTH000", "us", use_cache=False)
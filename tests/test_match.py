@@ -0,0 +1,97 @@
+from beets.autotag.distance import Distance
+from beets.autotag.hooks import AlbumInfo, AlbumMatch, TrackInfo
+from beets.importer import Action, ImportTask
+from beets.library import Item
+
+from tests.test_replay import ALBUM, save_book_fixtures
+
+
+def get_album_info(chapters: int) -> AlbumInfo:
+    tracks = [
+        TrackInfo(title=f"Chapter {i + 1}", length=60.0, index=i + 1, medium=1, data_source="Audible")
+        for i in range(chapters)
+    ]
+    return AlbumInfo(
+        tracks=tracks,
+        album="The Book",
+        album_id="B0TEST0000",
+        artist="The Author",
+        asin="B0TEST0000",
+        mediums=1,
+        data_source="Audible",
+    )
+
+
+def test_matches_apply_chapter_titles(plugin):
+    # like mbsync, which applies a match without going through the importer
+    items = [
+        Item(path=f"/audiobooks/The Book/Part {n}.mp3".encode(), title=f"Part {n}", track=n, length=180.0)
+        for n in range(1, 5)
+    ]
+    match = AlbumMatch(Distance(), get_album_info(12), {}, extra_items=items)
+    match.apply_metadata()
+
+    assert [item.title for item in items] == [
+        "Chapter 1 - Chapter 3",
+        "Chapter 4 - Chapter 6",
+        "Chapter 7 - Chapter 9",
+        "Chapter 10 - Chapter 12",
+    ]
+    assert all("chapter_title" not in item for item in items)
+    assert [item.track for item in items] == [1, 2, 3, 4]
+
+
+def get_provisional_match(plugin, product, items) -> AlbumMatch:
+    info = plugin.get_provisional_album_info(product, "us")
+    return AlbumMatch(Distance(), info, {}, extra_items=list(items))
+
+
+def make_items(files: int) -> list[Item]:
+    return [
+        Item(path=f"/audiobooks/{ALBUM}/Part {n}.mp3".encode(), title=f"Part {n}", track=n, length=30 * 60.0)
+        for n in range(1, files + 1)
+    ]
+
+
+def test_provisional_matches_match_no_files(plugin, tmp_path):
+    product = save_book_fixtures(str(tmp_path / "fixtures"), "B0SYNTH000", ALBUM, 4)
+    items = make_items(4)
+
+    match = get_provisional_match(plugin, product, items)
+
+    assert match.info.get("is_provisional")
+    assert match.mapping == {}
+    assert match.extra_items == items
+    # so it can't outscore a fetched book whose chapters match the files
+    assert match.distance.distance > 0.5
+
+
+def test_chosen_provisional_match_is_fetched(plugin, tmp_path):
+    product = save_book_fixtures(str(tmp_path / "fixtures"), "B0SYNTH000", ALBUM, 4)
+    items = make_items(4)
+    task = ImportTask(None, [i.path for i in items], items)
+    task.candidates = [get_provisional_match(plugin, product, items)]
+    task.set_choice(task.candidates[0])
+
+    plugin.on_import_task_choice(None, task)
+
+    assert task.choice_flag == Action.APPLY
+    assert not task.match.info.get("is_provisional")
+    assert [(item.title, track.title) for item, track in task.match.mapping.items()] == [
+        (f"Part {n}", f"Chapter {n}") for n in range(1, 5)
+    ]
+    assert task.match.extra_items == []
+
+
+def test_chosen_provisional_match_which_cant_be_fetched_is_skipped(plugin, tmp_path):
+    product = save_book_fixtures(str(tmp_path / "fixtures"), "B0SYNTH000", ALBUM, 4)
+    items = make_items(4)
+    task = ImportTask(None, [i.path for i in items], items)
+    task.candidates = [get_provisional_match(plugin, {**product, "asin": "B0MISSING0"}, items)]
+    task.set_choice(task.candidates[0])
+
+    plugin.on_import_task_choice(None, task)
+
+    # rather than applying the placeholder data of the search result
+    assert task.choice_flag == Action.SKIP
+    assert task.match is None
@@ -0,0 +1,75 @@
+import os
+import pstats
+import threading
+
+from beetsplug.profiling import Profiler, get_profile_filename
+
+
+def book_lookup():
+    return sum(range(1000))
+
+
+def test_profiles_each_task(tmp_path):
+    profiler = Profiler()
+    profiler.enable(str(tmp_path))
+    for key in ("/audiobooks/The Way of Kings", "/audiobooks/Words of Radiance", "/audiobooks/The Way of Kings"):
+        with profiler.profile(key):
+            book_lookup()
+
+    paths = profiler.write()
+
+    assert [os.path.basename(p) for p in paths] == [
+        get_profile_filename("/audiobooks/The Way of Kings"),
+        get_profile_filename("/audiobooks/Words of Radiance"),
+        "combined.prof",
+        "summary.txt",
+    ]
+    calls = {key[2]: stats[1] for key, stats in pstats.Stats(paths[0]).stats.items()}
+    assert calls["book_lookup"] == 2
+    calls = {key[2]: stats[1] for key, stats in pstats.Stats(paths[2]).stats.items()}
+    assert calls["book_lookup"] == 3
+
+
+def test_profiled_threads_dont_wait_for_each_other(tmp_path):
+    profiler = Profiler()
+    profiler.enable(str(tmp_path))
+    # both threads have to be in a profiled block at the same time to get past the barrier
+    barrier = threading.Barrier(2, timeout=5)
+    errors = []
+
+    def import_task(key):
+        try:
+            with profiler.profile(key):
+                book_lookup()
+                barrier.wait()
+        except threading.BrokenBarrierError as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=import_task, args=(key,)) for key in ("B0036UC2LO", "B002V0QK4C")]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    calls = {key[2]: stats[1] for key, stats in pstats.Stats(profiler.write()[-2]).stats.items()}
+    assert calls["book_lookup"] == 2
+
+
+def test_nested_calls_are_profiled_once(tmp_path):
+    profiler = Profiler()
+    profiler.enable(str(tmp_path))
+    with profiler.profile("B0036UC2LO"), profiler.profile("B002V0QK4C"):
+        book_lookup()
+    assert [os.path.basename(p) for p in profiler.write()] == [
+        get_profile_filename("B0036UC2LO"),
+        "combined.prof",
+        "summary.txt",
+    ]
+
+
+def test_disabled_profiler(tmp_path):
+    profiler = Profiler()
+    with profiler.profile("B0036UC2LO"):
+        book_lookup()
+    assert profiler.write() == []
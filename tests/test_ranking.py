@@ -0,0 +1,74 @@
+import pytest
+
+from beetsplug.ranking import PreRanker
+from tests.test_replay import ALBUM, ARTIST, save_book_fixtures
+
+# search results in the order Audible returned them, with the score each is given
+SCORES = {"B0SYNTH000": 0.6, "B0SYNTH001": 0.8, "B0SYNTH002": 0.2, "B0SYNTH003": 0.9}
+
+
+class FixedPreRanker(PreRanker):
+    def score(self, product, album, artist, runtime_sec):
+        return SCORES[product["asin"]]
+
+
+@pytest.fixture
+def products(plugin, tmp_path):
+    plugin.preranker = FixedPreRanker()
+    return [save_book_fixtures(str(tmp_path / "fixtures"), asin, f"{ALBUM} {asin}", 2) for asin in SCORES]
+
+
+def get_ranked_album_infos(plugin, products):
+    album_infos = plugin.get_ranked_album_infos(products, dict.fromkeys(SCORES, "us"), ALBUM, ARTIST, None)
+    return [(a.album_id, bool(a.get("is_provisional"))) for a in album_infos]
+
+
+def test_fetches_every_result_by_default(plugin, products):
+    assert get_ranked_album_infos(plugin, products) == [(asin, False) for asin in SCORES]
+
+
+def test_drops_results_below_the_threshold_or_past_max_detail_fetches(plugin, products):
+    plugin.config["prerank_threshold"] = 0.5
+    plugin.config["max_detail_fetches"] = 2
+    # the two best results are fetched, and kept in the order they were found in
+    assert get_ranked_album_infos(plugin, products) == [("B0SYNTH001", False), ("B0SYNTH003", False)]
+
+
+def test_defers_results_below_the_threshold_or_past_max_detail_fetches(plugin, products):
+    plugin.config["prerank_threshold"] = 0.5
+    plugin.config["max_detail_fetches"] = 2
+    plugin.config["prerank_action"] = "defer"
+    assert get_ranked_album_infos(plugin, products) == [
+        ("B0SYNTH000", True),
+        ("B0SYNTH001", False),
+        ("B0SYNTH002", True),
+        ("B0SYNTH003", False),
+    ]
+
+
+def test_lazy_candidates_only_fetch_the_best_results(plugin, products):
+    plugin.config["lazy_candidates"] = True
+    plugin.config["lazy_detail_count"] = 1
+    assert get_ranked_album_infos(plugin, products) == [
+        ("B0SYNTH000", True),
+        ("B0SYNTH001", True),
+        ("B0SYNTH002", True),
+        ("B0SYNTH003", False),
+    ]
+
+
+def test_results_which_cant_be_fetched_are_left_out(plugin, products, tmp_path):
+    plugin.config["max_detail_fetches"] = 2
+    plugin.config["prerank_action"] = "defer"
+    products[3]["asin"] = "B0MISSING0"
+    scores = {**SCORES, "B0MISSING0": SCORES["B0SYNTH003"]}
+    plugin.preranker.score = lambda product, *args: scores[product["asin"]]
+
+    album_infos = plugin.get_ranked_album_infos(products, dict.fromkeys(scores, "us"), ALBUM, ARTIST, None)
+
+    # it isn't deferred either, since its details were already found to be unavailable
+    assert [(a.album_id, bool(a.get("is_provisional"))) for a in album_infos] == [
+        ("B0SYNTH000", True),
+        ("B0SYNTH001", False),
+        ("B0SYNTH002", True),
+    ]
@@ -0,0 +1,132 @@
+import email.message
+import time
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+from urllib.error import HTTPError
+
+import pytest
+
+from beetsplug import api
+from beetsplug.ratelimit import RateLimiter, TokenBucket, parse_retry_after
+
+
+def test_token_bucket_allows_a_burst():
+    bucket = TokenBucket(rate=2, capacity=3)
+    now = bucket.updated_at
+    assert [bucket.reserve(now) for _ in range(5)] == [0.0, 0.0, 0.0, 0.5, 1.0]
+
+
+def test_token_bucket_refills_over_time():
+    bucket = TokenBucket(rate=2, capacity=3)
+    now = bucket.updated_at
+    for _ in range(3):
+        bucket.reserve(now)
+    # one token comes back every half a second
+    assert bucket.reserve(now + 0.5) == 0.0
+    assert bucket.reserve(now + 0.5) == pytest.approx(0.5)
+
+
+def test_token_bucket_refills_up_to_its_capacity():
+    bucket = TokenBucket(rate=2, capacity=3)
+    now = bucket.updated_at + 60
+    assert [bucket.reserve(now) for _ in range(4)] == [0.0, 0.0, 0.0, 0.5]
+
+
+def test_rate_limiter_spaces_requests_to_each_host():
+    limiter = RateLimiter(requests_per_second=2, burst=1)
+    assert limiter.reserve("api.audnex.us") == pytest.approx(0, abs=0.01)
+    assert limiter.reserve("api.audnex.us") == pytest.approx(0.5, abs=0.01)
+    assert limiter.reserve("api.audible.com") == pytest.approx(0, abs=0.01)
+
+
+def test_rate_limiter_is_disabled_without_a_rate():
+    limiter = RateLimiter(requests_per_second=0)
+    assert [limiter.reserve("api.audnex.us") for _ in range(100)] == [0.0] * 100
+
+
+def test_block_pauses_every_request_to_a_host():
+    limiter = RateLimiter(requests_per_second=0)
+    limiter.block("api.audnex.us", 5)
+    assert limiter.reserve("api.audnex.us") == pytest.approx(5, abs=0.1)
+    assert limiter.reserve("api.audnex.us") == pytest.approx(5, abs=0.1)
+    assert limiter.reserve("api.audible.com") == 0.0
+
+
+def test_block_doesnt_shorten_a_pause():
+    limiter = RateLimiter(requests_per_second=0)
+    limiter.block("api.audnex.us", 5)
+    limiter.block("api.audnex.us", 1)
+    assert limiter.reserve("api.audnex.us") == pytest.approx(5, abs=0.1)
+
+
+def test_block_applies_with_a_rate():
+    limiter = RateLimiter(requests_per_second=10, burst=10)
+    limiter.block("api.audnex.us", 5)
+    assert limiter.reserve("api.audnex.us") == pytest.approx(5, abs=0.1)
+
+
+@pytest.mark.parametrize(("attempt", "low", "high"), [(0, 1, 2), (1, 2, 4), (3, 8, 16), (10, 30, 60)])
+def test_backoff_is_jittered_and_capped(attempt, low, high):
+    limiter = RateLimiter(backoff_base=2, backoff_max=60)
+    for _ in range(20):
+        assert low <= limiter.backoff(attempt) <= high
+
+
+def get_http_date(seconds_from_now: float) -> str:
+    return format_datetime(datetime.now(timezone.utc) + timedelta(seconds=seconds_from_now), usegmt=True)
+
+
+@pytest.mark.parametrize(("value", "seconds"), [("120", 120.0), (" 5 ", 5.0), ("0", 0.0)])
+def test_parse_retry_after_seconds(value, seconds):
+    assert parse_retry_after(value) == seconds
+
+
+def test_parse_retry_after_http_date():
+    assert parse_retry_after(get_http_date(30)) == pytest.approx(30, abs=2)
+
+
+def test_parse_retry_after_http_date_in_the_past():
+    assert parse_retry_after(get_http_date(-30)) == 0.0
+
+
+@pytest.mark.parametrize("value", [None, "", "soon", "-5", "1.5", "Mon, 99 Foo 2024"])
+def test_parse_retry_after_garbage(value):
+    assert parse_retry_after(value) is None
+
+
+@pytest.fixture
+def rate_limiter(monkeypatch):
+    limiter = RateLimiter(requests_per_second=0, backoff_base=2, backoff_max=60)
+    monkeypatch.setattr(api, "rate_limiter", limiter)
+    return limiter
+
+
+def make_http_error(code: int, retry_after: str | None = None) -> HTTPError:
+    headers = email.message.Message()
+    if retry_after is not None:
+        headers["Retry-After"] = retry_after
+    return HTTPError("https://api.audnex.us/books/B0036UC2LO", code, "error", headers, None)
+
+
+def test_retry_delay_of_server_errors_backs_off(rate_limiter):
+    assert 2 <= api.get_retry_delay(make_http_error(503), "api.audnex.us", 1) <= 4
+    assert rate_limiter.reserve("api.audnex.us") == 0.0
+
+
+def test_retry_delay_of_rate_limited_requests_pauses_the_host(rate_limiter):
+    start = time.monotonic()
+    assert api.get_retry_delay(make_http_error(429, "7"), "api.audnex.us", 0) == 0
+    # the request waits along with every other request to the host instead
+    assert rate_limiter.reserve("api.audnex.us") == pytest.approx(8 - (time.monotonic() - start), abs=0.1)
+    assert rate_limiter.reserve("api.audible.com") == 0.0
+
+
+def test_retry_delay_of_rate_limited_requests_without_retry_after(rate_limiter):
+    assert api.get_retry_delay(make_http_error(429), "api.audnex.us", 2) == 0
+    assert 4 <= rate_limiter.reserve("api.audnex.us") <= 8
+
+
+def test_retry_delay_of_unavailable_hosts_with_retry_after_pauses_the_host(rate_limiter):
+    assert api.get_retry_delay(make_http_error(503, "7"), "api.audnex.us", 0) == 0
+    assert rate_limiter.reserve("api.audnex.us") == pytest.approx(8, abs=0.1)
+    assert rate_limiter.reserve("api.audible.com") == 0.0
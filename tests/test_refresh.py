@@ -0,0 +1,82 @@
+import json
+
+from beets.autotag.hooks import AlbumInfo, TrackInfo
+
+from beetsplug import api
+from beetsplug.cache import ResponseCache
+from tests.test_replay import save_book_fixtures
+
+# the number of chapters in each of the files "Part 1" to "Part 12"
+CHAPTERS_PER_FILE = [4, 3, 3, 4, 3, 3, 4, 3, 3, 4, 3, 3]
+
+
+def get_album_info(chapters: int) -> AlbumInfo:
+    tracks = [
+        TrackInfo(title=f"Chapter {i + 1}", length=60.0, index=i + 1, medium=1, data_source="Audible")
+        for i in range(chapters)
+    ]
+    return AlbumInfo(
+        tracks=tracks, album="The Book", album_id="B0TEST0000", artist="The Author", asin="B0TEST0000", mediums=1
+    )
+
+
+def test_refresh_titles_unpadded_files_in_natural_order(helper, plugin):
+    # imported before files were sorted naturally, so "Part 10" was numbered right after "Part 1"
+    names = sorted(f"Part {n}" for n in range(1, len(CHAPTERS_PER_FILE) + 1))
+    items = [
+        helper.add_item(
+            path=f"/audiobooks/The Book/{name}.mp3",
+            title=name,
+            album="The Book",
+            track=track,
+            length=CHAPTERS_PER_FILE[int(name.removeprefix("Part ")) - 1] * 60.0,
+        )
+        for track, name in enumerate(names, start=1)
+    ]
+    album = helper.lib.add_album(items)
+
+    album_info = get_album_info(sum(CHAPTERS_PER_FILE))
+    changed = plugin.apply_refreshed_album_info(
+        helper.lib, album, list(album.items()), album_info, move=False, write=False, pretend=False
+    )
+
+    assert changed
+    first_chapter = 1
+    for part, chapters in enumerate(CHAPTERS_PER_FILE, start=1):
+        item = helper.lib.items(f"path:'/audiobooks/The Book/Part {part}.mp3'").get()
+        last_chapter = first_chapter + chapters - 1
+        assert item.title == f"Chapter {first_chapter} - Chapter {last_chapter}"
+        assert item.track == part
+        first_chapter = last_chapter + 1
+
+
+def test_refresh_keeps_chapterized_files_in_their_imported_order(helper, plugin):
+    items = [
+        helper.add_item(path=f"/audiobooks/The Book/{n:02d}.mp3", title=f"Chapter {n}", track=n, length=60.0)
+        for n in range(1, 4)
+    ]
+    album = helper.lib.add_album(items)
+
+    album_info = get_album_info(3)
+    for track in album_info.tracks:
+        track.title = track.title.upper()
+    plugin.apply_refreshed_album_info(
+        helper.lib, album, list(album.items()), album_info, move=False, write=False, pretend=False
+    )
+
+    assert [(i.track, i.title) for i in helper.lib.items("track+")] == [(n, f"CHAPTER {n}") for n in range(1, 4)]
+
+
+def test_refresh_skips_cached_responses(plugin, tmp_path, monkeypatch):
+    response_cache = ResponseCache(str(tmp_path / "responses.db"))
+    monkeypatch.setattr(api, "response_cache", response_cache)
+    save_book_fixtures(str(tmp_path / "fixtures"), "B0SYNTH000", "The Way of Kings", 4)
+    # e.g cached by an import a few days ago, before the book's title was corrected
+    stale_book = json.loads(api.get_audnex_response("B0SYNTH000", "us", "book"))
+    response_cache.set("B0SYNTH000", "us", "book", json.dumps({**stale_book, "title": "The Way of Kngs"}).encode())
+
+    assert plugin.get_album_info("B0SYNTH000", "us").album == "The Way of Kngs"
+    assert plugin.get_refreshed_album_info("B0SYNTH000", "us").album == "The Way of Kings"
+    # the fresh response replaces the cached one
+    assert plugin.get_album_info("B0SYNTH000", "us").album == "The Way of Kings"
+    response_cache.close()
@@ -0,0 +1,172 @@
+import http.server
+import json
+import threading
+from urllib.error import HTTPError
+
+import pytest
+from beets.library import Item
+
+from beetsplug import api
+from beetsplug.replay import FixtureNotFoundError, RecordingClient, ReplayClient, fixture_path, save_fixture
+
+ALBUM = "The Way of Kings"
+ARTIST = "Brandon Sanderson"
+HEADERS = {"Content-Type": "application/json"}
+
+
+def save_json_fixture(fixtures_dir, url, data, status=200) -> None:
+    save_fixture(fixtures_dir, url, status, "OK", HEADERS, json.dumps(data).encode())
+
+
+def save_book_fixtures(fixtures_dir, asin: str, title: str, chapters: int, region: str = "us") -> dict:
+    """Saves the Audnex book and chapters of a book, and returns its Audible search result."""
+    book = {
+        "asin": asin,
+        "authors": [{"asin": "A1", "name": ARTIST}],
+        "description": "A book.",
+        "formatType": "unabridged",
+        "genres": [{"asin": "G1", "name": "Fantasy", "type": "genre"}],
+        "image": f"https://m.media-amazon.com/images/I/{asin}.jpg",
+        "language": "english",
+        "narrators": [{"name": "Michael Kramer"}, {"name": "Kate Reading"}],
+        "publisherName": "Macmillan Audio",
+        "releaseDate": "2010-08-31T00:00:00.000Z",
+        "runtimeLengthMin": chapters * 30,
+        "seriesPrimary": {"asin": "S1", "name": "The Stormlight Archive", "position": "1"},
+        "summary": "<p>A long book.</p>",
+        "title": title,
+        "region": region,
+    }
+    chapter_length_ms = 30 * 60 * 1000
+    chapter_info = {
+        "asin": asin,
+        "brandIntroDurationMs": 2000,
+        "brandOutroDurationMs": 5000,
+        "chapters": [
+            {
+                "lengthMs": chapter_length_ms,
+                "startOffsetMs": i * chapter_length_ms,
+                "startOffsetSec": i * chapter_length_ms // 1000,
+                "title": f"Chapter {i + 1}",
+            }
+            for i in range(chapters)
+        ],
+        "isAccurate": True,
+        "runtimeLengthMs": chapters * chapter_length_ms,
+        "runtimeLengthSec": chapters * chapter_length_ms // 1000,
+    }
+    save_json_fixture(fixtures_dir, api.get_audnex_url(asin, region, "book"), book)
+    save_json_fixture(fixtures_dir, api.get_audnex_url(asin, region, "chapters"), chapter_info)
+    return {
+        "asin": asin,
+        "title": title,
+        "authors": [{"asin": "A1", "name": ARTIST}],
+        "narrators": [{"name": "Michael Kramer"}, {"name": "Kate Reading"}],
+        "release_date": "2010-08-31",
+        "runtime_length_min": chapters * 30,
+        "language": "english",
+        "publisher_name": "Macmillan Audio",
+    }
+
+
+def save_search_fixture(fixtures_dir, query: str, region: str, products: list[dict]) -> None:
+    save_json_fixture(fixtures_dir, api.get_audible_search_url(query, region), {"products": products})
+
+
+def test_candidates_from_fixtures(plugin, tmp_path):
+    fixtures_dir = str(tmp_path / "fixtures")
+    products = [
+        save_book_fixtures(fixtures_dir, "B0SYNTH000", ALBUM, 4),
+        save_book_fixtures(fixtures_dir, "B0SYNTH001", f"{ALBUM} Companion", 2),
+    ]
+    save_search_fixture(fixtures_dir, f"{ALBUM} {ARTIST}", "us", products)
+    items = [
+        Item(path=f"/audiobooks/{ALBUM}/Part {i + 1}.mp3".encode(), title=f"Part {i + 1}", length=30 * 60.0)
+        for i in range(4)
+    ]
+
+    candidates = plugin.candidates(items, ARTIST, ALBUM, False)
+
+    assert [c.album_id for c in candidates] == ["B0SYNTH000", "B0SYNTH001"]
+    book = candidates[0]
+    assert (book.album, book.artist, book.series_name, book.data_source) == (
+        ALBUM,
+        ARTIST,
+        "The Stormlight Archive",
+        "Audible",
+    )
+    assert len(book.tracks) == 4
+    assert [t.title for t in book.tracks] == [f"Chapter {n}" for n in range(1, 5)]
+
+
+def test_candidates_without_fixtures(plugin):
+    items = [Item(path=f"/audiobooks/{ALBUM}/Part 1.mp3".encode(), title="Part 1", length=60.0)]
+    assert plugin.candidates(items, ARTIST, ALBUM, False) == []
+
+
+class BookHandler(http.server.BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.startswith("/api.audnex.us/books/B0036UC2LO"):
+            body = json.dumps({"asin": "B0036UC2LO", "path": self.path.partition("?")[0]}).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("X-Request-Path", self.path.partition("?")[0])
+        else:
+            body = b'{"error": "not found"}'
+            self.send_response(404, "Not Found")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def server_url():
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), BookHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+    server.server_close()
+
+
+def test_record_then_replay(tmp_path, server_url):
+    fixtures_dir = str(tmp_path / "fixtures")
+    url = "https://api.audnex.us/books/B0036UC2LO?region=us&key=secret"
+    missing_url = "https://api.audnex.us/books/B0MISSING0?region=us"
+    recorder = RecordingClient(fixtures_dir, base_url=server_url)
+    recorded = recorder.request(url)
+    with pytest.raises(HTTPError) as recorded_error:
+        recorder.request(missing_url)
+    recorder.close()
+
+    replayer = ReplayClient(fixtures_dir)
+    # the API key is left out of the fixture, so the response is found with any key
+    replayed = replayer.request("https://api.audnex.us/books/B0036UC2LO?key=other&region=us")
+    assert (replayed.status, replayed.body) == (recorded.status, recorded.body)
+    assert replayed.headers["Content-Type"] == "application/json"
+    assert replayed.headers["X-Request-Path"] == recorded.headers["X-Request-Path"]
+    with open(fixture_path(fixtures_dir, url)) as f:
+        assert "secret" not in f.read()
+
+    with pytest.raises(HTTPError) as replayed_error:
+        replayer.request(missing_url)
+    assert not isinstance(replayed_error.value, FixtureNotFoundError)
+    assert replayed_error.value.code == recorded_error.value.code == 404
+    assert replayed_error.value.read() == b'{"error": "not found"}'
+
+    with pytest.raises(FixtureNotFoundError):
+        replayer.request("https://api.audnex.us/books/B0036UC2LO?region=uk")
+    assert replayer.request_count == 3
+
+
+def test_record_then_replay_downloads(tmp_path, server_url):
+    fixtures_dir = str(tmp_path / "fixtures")
+    url = "https://api.audnex.us/books/B0036UC2LO/cover.jpg"
+    with open(tmp_path / "recorded", "wb") as f:
+        assert RecordingClient(fixtures_dir, base_url=server_url).download(url, f).status == 200
+    with open(tmp_path / "replayed", "wb") as f:
+        assert ReplayClient(fixtures_dir).download(url, f).body == b""
+    assert (tmp_path / "replayed").read_bytes() == (tmp_path / "recorded").read_bytes() != b""
@@ -0,0 +1,69 @@
+import pytest
+from beets.library import Item
+
+from beetsplug.replay import FixtureNotFoundError
+from tests.test_replay import ALBUM, ARTIST, save_book_fixtures, save_search_fixture
+
+QUERY = f"{ALBUM} {ARTIST}"
+
+
+@pytest.fixture
+def fixtures_dir(tmp_path):
+    return str(tmp_path / "fixtures")
+
+
+def test_search_regions_merges_results_by_asin(plugin, fixtures_dir):
+    save_search_fixture(fixtures_dir, QUERY, "uk", [{"asin": "B"}, {"asin": "C"}])
+    save_search_fixture(fixtures_dir, QUERY, "us", [{"asin": "A"}, {"asin": "B"}, {"asin": "D"}])
+
+    products, regions = plugin.search_regions(QUERY, ["uk", "us"])
+
+    # ordered by region, then by their order in that region's results, with each book kept from the first region
+    assert [p["asin"] for p in products] == ["B", "C", "A", "D"]
+    assert regions == {"B": "uk", "C": "uk", "A": "us", "D": "us"}
+
+
+def test_search_regions_prefers_regions_listed_first(plugin, fixtures_dir):
+    save_search_fixture(fixtures_dir, QUERY, "uk", [{"asin": "B"}, {"asin": "C"}])
+    save_search_fixture(fixtures_dir, QUERY, "us", [{"asin": "A"}, {"asin": "B"}])
+
+    products, regions = plugin.search_regions(QUERY, ["us", "uk"])
+
+    assert [p["asin"] for p in products] == ["A", "B", "C"]
+    assert regions == {"A": "us", "B": "us", "C": "uk"}
+
+
+def test_search_regions_skips_failed_regions(plugin, fixtures_dir, caplog):
+    # nothing was recorded for "de", so searching it fails
+    save_search_fixture(fixtures_dir, QUERY, "us", [{"asin": "A"}])
+
+    products, regions = plugin.search_regions(QUERY, ["de", "us"])
+
+    assert [p["asin"] for p in products] == ["A"]
+    assert regions == {"A": "us"}
+    assert "Could not search Audible for 'The Way of Kings Brandon Sanderson' in the 'de' region" in caplog.text
+
+
+def test_search_regions_raises_if_every_region_failed(plugin):
+    with pytest.raises(FixtureNotFoundError):
+        plugin.search_regions(QUERY, ["de", "us"])
+
+
+def test_candidates_are_fetched_from_the_region_they_were_found_in(plugin, fixtures_dir):
+    plugin.config["search_regions"] = ["uk", "us"]
+    uk_products = [save_book_fixtures(fixtures_dir, "B0SYNTH000", ALBUM, 4, region="uk")]
+    us_products = [
+        save_book_fixtures(fixtures_dir, "B0SYNTH001", f"{ALBUM} Companion", 2),
+        # also sold in the uk, but only recorded there, so fetching it from the us would fail
+        save_book_fixtures(fixtures_dir, "B0SYNTH000", ALBUM, 4, region="uk"),
+    ]
+    save_search_fixture(fixtures_dir, QUERY, "uk", uk_products)
+    save_search_fixture(fixtures_dir, QUERY, "us", us_products)
+    items = [
+        Item(path=f"/audiobooks/{ALBUM}/Part {i + 1}.mp3".encode(), title=f"Part {i + 1}", length=30 * 60.0)
+        for i in range(4)
+    ]
+
+    candidates = plugin.candidates(items, ARTIST, ALBUM, False)
+
+    assert [(c.album_id, c.region) for c in candidates] == [("B0SYNTH000", "uk"), ("B0SYNTH001", "us")]